@@ -13,22 +13,46 @@ from pathlib import Path
 script_dir = Path(__file__).parent
 archivo = Path.home() / ".local" / "share" / "todolist-tree" / "todolist-tree.md"
 
+# Buffer de lectura de 128 KiB: el archivo se lee entero en una o pocas llamadas
+_BUFFER_SIZE = 1 << 17
+
+# Patrones compilados una sola vez (se usan por cada línea del archivo)
+_TASK_RE = re.compile(r"^(\s*)[-*]\s+\[( |x)\]\s+(.*)")
+_ICONOS = ('🔲', '📁')
+
 class Nodo:
-    def __init__(self, texto, nivel, checked, linea_idx):
+    __slots__ = ('texto', 'nivel', 'checked', 'linea_idx', 'byte_offset', 'hijos', 'hijos_pendientes', 'es_hoja', 'padre')
+
+    def __init__(self, texto, nivel, checked, linea_idx, byte_offset):
         self.texto = texto
         self.nivel = nivel
         self.checked = checked
         self.linea_idx = linea_idx
+        self.byte_offset = byte_offset  # posición en bytes del "[" del checkbox
         self.hijos = []
+        self.hijos_pendientes = 0  # hijos directos sin marcar
+        self.es_hoja = True
         self.padre = None
 
 def parsear_tareas(lineas):
+    """Construir el árbol a partir de cualquier iterable de líneas (lista o archivo abierto)"""
     nodos = []
+    por_texto = {}  # texto -> primer Nodo con ese texto
     stack = []
+    match_tarea = _TASK_RE.match
+    offset = 0
 
     for idx, linea in enumerate(lineas):
+        inicio_linea = offset
+        offset += len(linea.encode('utf-8'))
+
+        # Descartar rápido líneas que no son elementos de lista (vacías, títulos, texto)
+        contenido = linea.lstrip()
+        if not contenido or contenido[0] not in '-*':
+            continue
+
         # Detectar checkbox con niveles según indentación (espacios o tabs)
-        m = re.match(r"^(\s*)[-*]\s+\[( |x)\]\s+(.*)", linea)
+        m = match_tarea(linea)
         if not m:
             continue
 
@@ -39,7 +63,11 @@ def parsear_tareas(lineas):
         else:
             nivel = len(indent) // 4  # 4 espacios = 1 nivel
 
-        nodo = Nodo(texto.strip(), nivel, check == "x", idx)
+        # El "[" está justo antes del carácter de check
+        inicio_check = m.start(2) - 1
+        byte_offset = inicio_linea + len(linea[:inicio_check].encode('utf-8'))
+
+        nodo = Nodo(texto.strip(), nivel, check == "x", idx, byte_offset)
 
         # Insertar en el árbol
         while stack and stack[-1].nivel >= nivel:
@@ -48,83 +76,103 @@ def parsear_tareas(lineas):
         if stack:
             nodo.padre = stack[-1]
             stack[-1].hijos.append(nodo)
+            stack[-1].es_hoja = False
+            if not nodo.checked:
+                stack[-1].hijos_pendientes += 1
 
         stack.append(nodo)
         nodos.append(nodo)
+        por_texto.setdefault(nodo.texto, nodo)
 
-    return nodos
+    return nodos, por_texto
 
 def listar_tareas_pendientes(nodos):
     """Obtener lista de todas las tareas pendientes con formato jerárquico"""
     tareas = []
     
-    def agregar_tareas(nodo, prefijo=""):
+    # Recorrido en profundidad con pila explícita (hijos apilados en orden inverso)
+    stack = [(nodo, "") for nodo in reversed(nodos) if nodo.padre is None]
+    while stack:
+        nodo, prefijo = stack.pop()
         if not nodo.checked:
             # Mostrar tarea con indentación visual
-            indicador = "🔲" if not nodo.hijos else "📁"
+            indicador = "🔲" if nodo.es_hoja else "📁"
             tareas.append(f"{prefijo}{indicador} {nodo.texto}")
         
         # Agregar hijos (aunque el padre esté marcado, los hijos pueden estar desmarcados)
-        for hijo in nodo.hijos:
-            nuevo_prefijo = prefijo + "  " if prefijo else ""
-            agregar_tareas(hijo, nuevo_prefijo)
-    
-    for nodo in nodos:
-        if nodo.padre is None:  # raíz
-            agregar_tareas(nodo)
+        nuevo_prefijo = prefijo + "  " if prefijo else ""
+        stack.extend((hijo, nuevo_prefijo) for hijo in reversed(nodo.hijos))
     
     return tareas
 
-def marcar_tarea(lineas, nodos, texto_seleccionado):
+def limpiar_seleccion(seleccion):
+    """Quitar el icono y los espacios de una opción de rofi"""
+    texto = seleccion.lstrip()
+    if texto.startswith(_ICONOS):
+        texto = texto[1:]
+    return texto.strip()
+
+def marcar_tarea(f, por_texto, texto_seleccionado):
     """Marcar la tarea seleccionada y propagar hacia arriba"""
     # Limpiar el texto seleccionado (quitar iconos y espacios)
-    texto_limpio = re.sub(r'^[\s]*[🔲📁]\s*', '', texto_seleccionado).strip()
+    texto_limpio = limpiar_seleccion(texto_seleccionado)
     
     # Buscar nodo por texto exacto
-    nodo_obj = None
-    for n in nodos:
-        if n.texto == texto_limpio:
-            nodo_obj = n
-            break
+    nodo_obj = por_texto.get(texto_limpio)
     
     if not nodo_obj:
         return False
 
-    # Marcar nodo como hecho (en el archivo)
-    linea = lineas[nodo_obj.linea_idx]
-    nueva_linea = re.sub(r"\[ \]", "[x]", linea, count=1)
-    lineas[nodo_obj.linea_idx] = nueva_linea
+    # Offsets de los "[ ]" a sobrescribir; se escriben todos juntos al final
+    offsets = [nodo_obj.byte_offset]
 
     # Actualizar estado en memoria
+    era_pendiente = not nodo_obj.checked
     nodo_obj.checked = True
 
-    # Subir recursivamente y marcar padres si todos sus hijos están marcados
+    # Subir y marcar padres mientras no les queden hijos pendientes
     padre = nodo_obj.padre
     while padre:
-        if all(h.checked for h in padre.hijos):
-            # Marcar padre en archivo y memoria
-            linea_padre = lineas[padre.linea_idx]
-            nueva_linea_padre = re.sub(r"\[ \]", "[x]", linea_padre, count=1)
-            lineas[padre.linea_idx] = nueva_linea_padre
-            padre.checked = True
-            padre = padre.padre
-        else:
+        if era_pendiente:
+            padre.hijos_pendientes -= 1
+        if padre.hijos_pendientes:
             break
+        # Marcar padre en archivo y memoria
+        offsets.append(padre.byte_offset)
+        era_pendiente = not padre.checked
+        padre.checked = True
+        padre = padre.padre
+
+    # El archivo pudo cambiar mientras rofi estaba abierto: si el checkbox de la tarea ya no
+    # está donde se leyó, no se escribe nada
+    fd = f.fileno()
+    if os.pread(fd, 3, offsets[0]) not in (b"[ ]", b"[x]"):
+        return False
+
+    # Aplicar las marcas con pwrite (sin seek intermedios), solo sobre "[ ]" intactos
+    for offset in offsets:
+        if os.pread(fd, 3, offset) == b"[ ]":
+            os.pwrite(fd, b"[x]", offset)
 
     return True
 
+def _notify(titulo, cuerpo):
+    """Lanzar notify-send sin esperar a que termine"""
+    subprocess.Popen(
+        ["notify-send", titulo, cuerpo],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
 def mostrar_rofi(opciones):
     """Mostrar menú rofi con las opciones disponibles"""
     if not opciones:
-        subprocess.run([
-            "notify-send", 
-            "Todolist Tree", 
-            "¡Todas las tareas están completadas! 🎉"
-        ])
+        _notify("Todolist Tree", "¡Todas las tareas están completadas! 🎉")
         return None
     
-    # Preparar entrada para rofi
-    entrada = "\n".join(opciones)
+    # Preparar entrada para rofi (codificada una sola vez, sin capa de texto)
+    entrada = "\n".join(opciones).encode("utf-8")
     
     try:
         result = subprocess.run([
@@ -136,63 +184,45 @@ def mostrar_rofi(opciones):
             "-theme-str", "listview { lines: 10; }"
         ], 
         input=entrada, 
-        text=True, 
-        capture_output=True
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
         )
         
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
+        seleccion = result.stdout.decode("utf-8").strip()
+        if result.returncode == 0 and seleccion:
+            return seleccion
         
     except FileNotFoundError:
         # Si rofi no está disponible, mostrar notificación
-        subprocess.run([
-            "notify-send", 
-            "Error", 
-            "Rofi no está instalado"
-        ])
+        _notify("Error", "Rofi no está instalado")
     
     return None
 
 def main():
     try:
-        with open(archivo, "r", encoding="utf-8") as f:
-            lineas = f.readlines()
+        # newline="" conserva los finales de línea originales para que los offsets en bytes sean exactos
+        with open(archivo, "r", encoding="utf-8", newline="", buffering=_BUFFER_SIZE) as f:
+            nodos, por_texto = parsear_tareas(f)
     except FileNotFoundError:
-        subprocess.run([
-            "notify-send", 
-            "Error", 
-            f"No se encontró el archivo {archivo}"
-        ])
+        _notify("Error", f"No se encontró el archivo {archivo}")
         sys.exit(1)
 
-    nodos = parsear_tareas(lineas)
     tareas_pendientes = listar_tareas_pendientes(nodos)
     
     # Mostrar rofi y obtener selección
     seleccion = mostrar_rofi(tareas_pendientes)
     
     if seleccion:
-        # Marcar la tarea seleccionada
-        exito = marcar_tarea(lineas, nodos, seleccion)
+        # Marcar la tarea seleccionada (los cambios se escriben en el archivo directamente)
+        with open(archivo, "r+b", buffering=0) as f:
+            exito = marcar_tarea(f, por_texto, seleccion)
         
         if exito:
-            # Guardar cambios
-            with open(archivo, "w", encoding="utf-8") as f:
-                f.writelines(lineas)
-            
             # Mostrar notificación de éxito
-            texto_limpio = re.sub(r'^[\s]*[🔲📁]\s*', '', seleccion).strip()
-            subprocess.run([
-                "notify-send", 
-                "Tarea Completada", 
-                f"✅ {texto_limpio}"
-            ])
+            texto_limpio = limpiar_seleccion(seleccion)
+            _notify("Tarea Completada", f"✅ {texto_limpio}")
         else:
-            subprocess.run([
-                "notify-send", 
-                "Error", 
-                "No se pudo marcar la tarea"
-            ])
+            _notify("Error", "No se pudo marcar la tarea")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
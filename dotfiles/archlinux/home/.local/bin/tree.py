@@ -9,22 +9,45 @@ from pathlib import Path
 script_dir = Path(__file__).parent
 archivo = Path.home() / ".local" / "share" / "todolist-tree" / "todolist-tree.md"
 
+# Buffer de lectura de 128 KiB: el archivo se lee entero en una o pocas llamadas
+_BUFFER_SIZE = 1 << 17
+
+# Patrones compilados una sola vez (se usan por cada línea del archivo)
+_TASK_RE = re.compile(r"^(\s*)[-*]\s+\[( |x)\]\s+(.*)")
+
 class Nodo:
-    def __init__(self, texto, nivel, checked, linea_idx):
+    __slots__ = ('texto', 'nivel', 'checked', 'linea_idx', 'byte_offset', 'hijos', 'hijos_pendientes', 'tooltip_line', 'padre')
+
+    def __init__(self, texto, nivel, checked, linea_idx, byte_offset):
         self.texto = texto
         self.nivel = nivel
         self.checked = checked
         self.linea_idx = linea_idx
+        self.byte_offset = byte_offset  # posición en bytes del "[" del checkbox
         self.hijos = []
+        self.hijos_pendientes = 0  # hijos directos sin marcar
+        self.tooltip_line = f"[ ] {texto}"  # línea ya formateada para el tooltip
         self.padre = None
 
 def parsear_tareas(lineas):
+    """Construir el árbol a partir de cualquier iterable de líneas (lista o archivo abierto)"""
     nodos = []
+    por_texto = {}  # texto -> primer Nodo con ese texto
     stack = []
+    match_tarea = _TASK_RE.match
+    offset = 0
 
     for idx, linea in enumerate(lineas):
+        inicio_linea = offset
+        offset += len(linea.encode('utf-8'))
+
+        # Descartar rápido líneas que no son elementos de lista (vacías, títulos, texto)
+        contenido = linea.lstrip()
+        if not contenido or contenido[0] not in '-*':
+            continue
+
         # Detectar checkbox con niveles según indentación (espacios o tabs)
-        m = re.match(r"^(\s*)[-*]\s+\[( |x)\]\s+(.*)", linea)
+        m = match_tarea(linea)
         if not m:
             continue
 
@@ -35,7 +58,11 @@ def parsear_tareas(lineas):
         else:
             nivel = len(indent) // 4  # 4 espacios = 1 nivel
 
-        nodo = Nodo(texto.strip(), nivel, check == "x", idx)
+        # El "[" está justo antes del carácter de check
+        inicio_check = m.start(2) - 1
+        byte_offset = inicio_linea + len(linea[:inicio_check].encode('utf-8'))
+
+        nodo = Nodo(texto.strip(), nivel, check == "x", idx, byte_offset)
 
         # Insertar en el árbol
         while stack and stack[-1].nivel >= nivel:
@@ -44,11 +71,14 @@ def parsear_tareas(lineas):
         if stack:
             nodo.padre = stack[-1]
             stack[-1].hijos.append(nodo)
+            if not nodo.checked:
+                stack[-1].hijos_pendientes += 1
 
         stack.append(nodo)
         nodos.append(nodo)
+        por_texto.setdefault(nodo.texto, nodo)
 
-    return nodos
+    return nodos, por_texto
 
 def buscar_primera_tarea_pendiente(nodos):
     """
@@ -67,19 +97,15 @@ def buscar_primera_tarea_pendiente(nodos):
         if nodo.checked:
             return None
             
-        # Si no tiene hijos, es una tarea directamente trabajable
-        if not nodo.hijos:
-            return nodo
-            
-        # Si tiene hijos, buscar primera subtarea trabajable
-        for hijo in nodo.hijos:
-            subtarea = encontrar_tarea_trabajable(hijo)
-            if subtarea:
-                return subtarea
-                
+        # Descender iterativamente por la primera subtarea pendiente.
+        # Si no tiene hijos, es una tarea directamente trabajable.
         # Si todos los hijos están completos pero este nodo no, algo está mal
         # (esto se solucionaría con la propagación automática)
-        return nodo
+        while True:
+            siguiente = next((h for h in nodo.hijos if not h.checked), None)
+            if siguiente is None:
+                return nodo
+            nodo = siguiente
     
     # Buscar en tareas principales (nivel 0) primero
     for nodo in nodos:
@@ -90,63 +116,59 @@ def buscar_primera_tarea_pendiente(nodos):
                 
     return None
 
-def marcar_tarea(lineas, nodos, texto_seleccionado):
+def marcar_tarea(f, por_texto, texto_seleccionado):
     # Marcar la tarea seleccionada y sus padres si corresponde
     # Buscar nodo por texto exacto
-    nodo_obj = None
-    for n in nodos:
-        if n.texto == texto_seleccionado:
-            nodo_obj = n
-            break
+    nodo_obj = por_texto.get(texto_seleccionado)
     if not nodo_obj:
         print("No se encontró la tarea seleccionada.", file=sys.stderr)
         return False
 
-    # Marcar nodo como hecho (en el archivo)
-    linea = lineas[nodo_obj.linea_idx]
-    nueva_linea = re.sub(r"\[ \]", "[x]", linea, count=1)
-    lineas[nodo_obj.linea_idx] = nueva_linea
+    # Offsets de los "[ ]" a sobrescribir; se escriben todos juntos al final
+    offsets = [nodo_obj.byte_offset]
 
     # Actualizar estado en memoria
+    era_pendiente = not nodo_obj.checked
     nodo_obj.checked = True
 
-    # Subir recursivamente y marcar padres si todos sus hijos están marcados
+    # Subir y marcar padres mientras no les queden hijos pendientes
     padre = nodo_obj.padre
     while padre:
-        if all(h.checked for h in padre.hijos):
-            # Marcar padre en archivo y memoria
-            linea_padre = lineas[padre.linea_idx]
-            nueva_linea_padre = re.sub(r"\[ \]", "[x]", linea_padre, count=1)
-            lineas[padre.linea_idx] = nueva_linea_padre
-            padre.checked = True
-            padre = padre.padre
-        else:
+        if era_pendiente:
+            padre.hijos_pendientes -= 1
+        if padre.hijos_pendientes:
             break
+        # Marcar padre en archivo y memoria
+        offsets.append(padre.byte_offset)
+        era_pendiente = not padre.checked
+        padre.checked = True
+        padre = padre.padre
+
+    # El archivo pudo cambiar entre la lectura y la escritura: si el checkbox de la tarea
+    # ya no está donde se leyó, no se escribe nada
+    fd = f.fileno()
+    if os.pread(fd, 3, offsets[0]) not in (b"[ ]", b"[x]"):
+        print("El archivo de tareas cambió; vuelve a intentarlo.", file=sys.stderr)
+        return False
+
+    # Aplicar las marcas con pwrite (sin seek intermedios), solo sobre "[ ]" intactos
+    for offset in offsets:
+        if os.pread(fd, 3, offset) == b"[ ]":
+            os.pwrite(fd, b"[x]", offset)
 
     return True
 
 def generar_tooltip(nodos):
     """Generar tooltip con todas las tareas pendientes"""
-    pendientes = []
-    
-    def agregar_pendientes(nodo, prefijo=""):
-        if not nodo.checked:
-            pendientes.append(f"{prefijo}[ ] {nodo.texto}")
-        
-        for hijo in nodo.hijos:
-            nuevo_prefijo = prefijo + "  " if prefijo else ""
-            agregar_pendientes(hijo, nuevo_prefijo)
-    
-    for nodo in nodos:
-        if nodo.padre is None:  # raíz
-            agregar_pendientes(nodo)
-    
-    return "\n".join(pendientes) if pendientes else "✅ Todas las tareas completadas"
+    # nodos ya está en orden del archivo, que coincide con el recorrido en profundidad
+    tooltip = "\n".join(nodo.tooltip_line for nodo in nodos if not nodo.checked)
+    return tooltip or "✅ Todas las tareas completadas"
 
 def main():
     try:
-        with open(archivo, "r", encoding="utf-8") as f:
-            lineas = f.readlines()
+        # newline="" conserva los finales de línea originales para que los offsets en bytes sean exactos
+        with open(archivo, "r", encoding="utf-8", newline="", buffering=_BUFFER_SIZE) as f:
+            nodos, por_texto = parsear_tareas(f)
     except FileNotFoundError:
         # Si no existe el archivo, crear uno básico
         contenido_inicial = """# Lista de tareas con estructura
@@ -160,18 +182,14 @@ def main():
 """
         with open(archivo, "w", encoding="utf-8") as f:
             f.write(contenido_inicial)
-        lineas = contenido_inicial.splitlines(True)
-
-    nodos = parsear_tareas(lineas)
+        nodos, por_texto = parsear_tareas(contenido_inicial.splitlines(True))
 
     # Si se llamó con argumento, es para marcar esa tarea
     if len(sys.argv) > 1:
         tarea_a_marcar = sys.argv[1]
-        exito = marcar_tarea(lineas, nodos, tarea_a_marcar)
-        if exito:
-            with open(archivo, "w", encoding="utf-8") as f:
-                f.writelines(lineas)
-        else:
+        with open(archivo, "r+b", buffering=0) as f:
+            exito = marcar_tarea(f, por_texto, tarea_a_marcar)
+        if not exito:
             sys.exit(1)
         sys.exit(0)
 
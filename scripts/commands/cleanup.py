@@ -5,9 +5,10 @@ Comando para limpiar archivos del repositorio que no deberían estar según patr
 """
 
 import os
+import sys
 import logging
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,10 @@ class CleanupCommand:
         self.ignore = ignore_manager
         self.dotfiles_dir = dotfiles_dir
         self.dry_run = dry_run
+        
+        # Decisiones ignore/include ya evaluadas, por ruta normalizada
+        self._ignore_cache: Dict[str, bool] = {}
+        self._included_cache: Dict[str, bool] = {}
     
     def scan_ignored_files_in_repo(self) -> List[Tuple[Path, str]]:
         """Escanear repositorio buscando archivos que coinciden con patrones ignore"""
@@ -39,34 +44,83 @@ class CleanupCommand:
         return ignored_files
     
     def _scan_directory(self, base_dir: Path, context: str) -> List[Tuple[Path, str]]:
-        """Escanear un directorio específico buscando archivos ignorados"""
+        """Escanear un directorio específico buscando archivos ignorados
+        
+        Los directorios ignorados se reportan completos y no se recorren: su
+        contenido se elimina junto con ellos, así que no hace falta evaluarlo.
+        """
         ignored_files = []
+        base_prefix = str(base_dir) + os.sep
         
-        for root, dirs, files in os.walk(base_dir):
-            for item in dirs + files:
-                item_path = Path(root) / item
-                
-                # Obtener ruta relativa desde base_dir
-                relative_path = item_path.relative_to(base_dir)
+        # Resolver una sola vez todo lo que depende del contexto
+        if context == "common":
+            # En common, solo verificar ignore y quitar prefijo "home/" para normalizar
+            is_ignored = self._is_ignored
+            strip_prefix = "home" + os.sep
+            reason_suffix = ""
+        else:
+            # En carpetas hostname, verificar que no esté explícitamente incluido
+            def is_ignored(path: str) -> bool:
+                return self._is_ignored(path) and not self._is_included(path)
+            strip_prefix = None
+            reason_suffix = f" (not explicit in {context})"
+        strip_len = len(strip_prefix) if strip_prefix else 0
+        
+        # Recorrido en profundidad con pila explícita (mismo orden que os.walk)
+        pending = [str(base_dir)]
+        while pending:
+            subdirs = []
+            
+            for entry, is_dir in self._list_entries(pending.pop()):
+                # Obtener ruta relativa desde base_dir (slice directo, sin reparsear la ruta)
+                relative_path = entry.path[len(base_prefix):]
                 
-                # Para common, quitar prefijo "home/" si existe para normalizar
-                if context == "common" and str(relative_path).startswith("home/"):
-                    normalized_path = str(relative_path)[5:]  # Quitar "home/"
+                if strip_prefix and relative_path.startswith(strip_prefix):
+                    normalized_path = relative_path[strip_len:]
                 else:
-                    normalized_path = str(relative_path)
+                    normalized_path = relative_path
                 
                 # Verificar si debería ser ignorado
-                if context == "common":
-                    # En common, solo verificar ignore
-                    if self.ignore.should_ignore_path(normalized_path):
-                        ignored_files.append((item_path, f"ignore pattern: {normalized_path}"))
-                else:
-                    # En carpetas hostname, verificar que no esté explícitamente incluido
-                    if (self.ignore.should_ignore_path(normalized_path) and
-                        not self.ignore.is_explicitly_included(normalized_path)):
-                        ignored_files.append((item_path, f"ignore pattern: {normalized_path} (not explicit in {context})"))
+                if is_ignored(normalized_path):
+                    ignored_files.append((entry.path, f"ignore pattern: {normalized_path}{reason_suffix}"))
+                    continue
+                
+                # Solo descender en directorios que no fueron ignorados
+                if is_dir:
+                    subdirs.append(entry.path)
+            
+            pending.extend(reversed(subdirs))
         
-        return ignored_files
+        # Solo se construyen objetos Path para los elementos que se devuelven
+        return [(Path(path), reason) for path, reason in ignored_files]
+    
+    def _is_ignored(self, normalized_path: str) -> bool:
+        """should_ignore_path memoizado por ruta normalizada"""
+        ignored = self._ignore_cache.get(normalized_path)
+        if ignored is None:
+            ignored = self._ignore_cache[normalized_path] = self.ignore.should_ignore_path(normalized_path)
+        return ignored
+    
+    def _is_included(self, normalized_path: str) -> bool:
+        """is_explicitly_included memoizado por ruta normalizada"""
+        included = self._included_cache.get(normalized_path)
+        if included is None:
+            included = self._included_cache[normalized_path] = self.ignore.is_explicitly_included(normalized_path)
+        return included
+    
+    def _list_entries(self, directory: str) -> List[Tuple[os.DirEntry, bool]]:
+        """Listar un directorio con os.scandir: subdirectorios primero, luego archivos
+        
+        El tipo se obtiene de la DirEntry, sin stat() adicional, y los symlinks
+        a directorios se tratan como archivos (no se siguen).
+        """
+        try:
+            with os.scandir(directory) as it:
+                entries = [(entry, entry.is_dir(follow_symlinks=False)) for entry in it]
+        except OSError:
+            return []
+        
+        return [e for e in entries if e[1]] + [e for e in entries if not e[1]]
     
     def cleanup_ignored_files(self, ignored_files: List[Tuple[Path, str]]) -> bool:
         """Eliminar archivos ignorados del repositorio"""
@@ -77,13 +131,13 @@ class CleanupCommand:
         print(f"🧹 Encontrados {len(ignored_files)} elementos para limpiar:")
         print()
         
-        # Mostrar lista de elementos a eliminar
+        # Mostrar lista de elementos a eliminar (una sola escritura para toda la lista)
+        chunks = []
         for file_path, reason in ignored_files:
             relative_to_repo = file_path.relative_to(self.dotfiles_dir)
-            print(f"📁 {relative_to_repo}")
-            print(f"   Razón: {reason}")
-        
-        print()
+            chunks.append(f"📁 {relative_to_repo}\n   Razón: {reason}\n")
+        chunks.append("\n")
+        sys.stdout.write("".join(chunks))
         
         if self.dry_run:
             print("🔍 [DRY-RUN] Los archivos arriba serían eliminados del repositorio")
@@ -96,14 +150,21 @@ class CleanupCommand:
             print("❌ Limpieza cancelada")
             return False
         
-        # Eliminar archivos
+        # Eliminar archivos. Ordenando por componentes, el contenido de un directorio
+        # queda justo después de él y se omite si rmtree ya lo eliminó.
         success_count = 0
-        for file_path, reason in ignored_files:
+        removed_root = None
+        for file_path, reason in sorted(ignored_files, key=lambda item: item[0].parts):
+            if removed_root and str(file_path).startswith(removed_root):
+                success_count += 1
+                continue
+            
             try:
                 if file_path.is_dir():
                     # Eliminar directorio y su contenido
                     import shutil
                     shutil.rmtree(file_path)
+                    removed_root = str(file_path) + os.sep
                     logger.info(f"Directorio eliminado: {file_path}")
                 else:
                     # Eliminar archivo
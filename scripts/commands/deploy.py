@@ -6,14 +6,27 @@ para permitir rollback en caso de problemas.
 """
 
 import os
+import stat
+import time
 import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Hilos para copiar archivos en paralelo (la copia de archivos pequeños está dominada por E/S)
+_COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _copy_file(src: str, dst: str, st: os.stat_result) -> None:
+    """Copiar contenido, permisos y tiempos de un archivo usando el stat ya obtenido"""
+    shutil.copyfile(src, dst)
+    os.chmod(dst, stat.S_IMODE(st.st_mode))
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
 class DeployCommand:
     """Comando de despliegue seguro con backup"""
     
@@ -41,38 +54,77 @@ class DeployCommand:
         # Obtener rutas gestionadas
         managed_paths = self._get_managed_paths()
         
-        for path_info in managed_paths:
+        # Las rutas resueltas se memorizan durante el escaneo; se descartan las de escaneos
+        # anteriores porque el despliegue cambia los symlinks de $HOME
+        self.path_utils.clear_resolve_cache()
+        resolve_cached = self.path_utils.resolve_cached
+        
+        # stat de las rutas del repo y lstat de las rutas en $HOME, cada uno de una vez
+        repo_paths = [self._get_repo_path(path_info['source'], path_info['normalized'])
+                      for path_info in managed_paths]
+        repo_stats = self.path_utils.batch_stat(repo_paths)
+        home_stats = self.path_utils.batch_stat(
+            [self.home_dir / path_info['normalized'] for path_info in managed_paths],
+            follow_symlinks=False)
+        
+        for path_info, repo_path, repo_st, st in zip(managed_paths, repo_paths, repo_stats, home_stats):
             normalized_path = path_info['normalized']
             source = path_info['source']
             
-            # Verificar existencia en repo
-            repo_path = self._get_repo_path(source, normalized_path)
-            if not repo_path.exists():
+            # Verificar existencia en repo (stat ya hecho)
+            if repo_st is None:
                 continue
+            repo_str = os.fspath(repo_path)
             
-            # Verificar existencia en $HOME
-            home_path = self.home_dir / normalized_path
-            if not home_path.exists():
+            # Verificar existencia en $HOME (lstat ya hecho)
+            if st is None:
                 continue
+            home_path = self.home_dir / normalized_path
+            
+            is_symlink = stat.S_ISLNK(st.st_mode)
+            if is_symlink:
+                # Camino rápido: comparar el destino del enlace con la ruta esperada sin resolver toda la cadena
+                link = os.readlink(home_path)
+                if link == repo_str:
+                    continue
+                
+                # Solo los enlaces relativos (los de stow) necesitan el padre resuelto
+                if os.path.isabs(link):
+                    target = os.path.normpath(link)
+                else:
+                    target = os.path.normpath(os.path.join(resolve_cached(home_path.parent), link))
+                root = resolve_cached(self._get_repo_path(source, ""))
+                if target == os.path.normpath(os.path.join(root, normalized_path)):
+                    continue
+                
+                # Los symlinks rotos no cuentan como existentes
+                try:
+                    st = os.stat(home_path)
+                except OSError:
+                    continue
+                
+                # Symlink correcto a través de otros enlaces intermedios
+                if resolve_cached(home_path) == resolve_cached(repo_path):
+                    continue
             
             # Si existe pero no es symlink correcto, es conflictivo
-            if not (home_path.is_symlink() and 
-                   home_path.resolve() == repo_path.resolve()):
-                conflicting_files.append({
-                    'path': normalized_path,
-                    'source': source,
-                    'home_path': home_path,
-                    'repo_path': repo_path,
-                    'is_symlink': home_path.is_symlink(),
-                    'is_file': home_path.is_file(),
-                    'is_dir': home_path.is_dir()
-                })
+            conflicting_files.append({
+                'path': normalized_path,
+                'source': source,
+                'home_path': home_path,
+                'repo_path': repo_path,
+                'is_symlink': is_symlink,
+                'is_file': stat.S_ISREG(st.st_mode),
+                'is_dir': stat.S_ISDIR(st.st_mode)
+            })
         
         return conflicting_files
     
     def create_backup(self, files_to_backup: List[Dict]) -> str:
         """Crear backup timestamped de archivos conflictivos"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Un solo instante para el nombre y la cabecera; time.strftime evita crear un datetime
+        now = time.time()
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
         backup_name = f"backup_{timestamp}"
         current_backup_dir = self.backup_dir / backup_name
         
@@ -82,35 +134,63 @@ class DeployCommand:
         
         current_backup_dir.mkdir(parents=True, exist_ok=True)
         
-        # Crear archivo de metadatos
-        metadata_file = current_backup_dir / "backup_metadata.txt"
-        with open(metadata_file, 'w') as f:
-            f.write(f"Backup creado: {datetime.now().isoformat()}\n")
-            f.write(f"Hostname: {self.hostname}\n")
-            f.write(f"Total archivos: {len(files_to_backup)}\n")
-            f.write("\nArchivos respaldados:\n")
-            
+        # Cabecera de metadatos (con la fecha de inicio del backup)
+        lines = [
+            f"Backup creado: {datetime.fromtimestamp(now).isoformat()}\n",
+            f"Hostname: {self.hostname}\n",
+            f"Total archivos: {len(files_to_backup)}\n",
+            "\nArchivos respaldados:\n"
+        ]
+        copied = 0
+        
+        # Encolar todas las copias (archivos sueltos y contenido de directorios) en un
+        # único pool y esperar una sola vez al final
+        queued = []
+        with ThreadPoolExecutor(max_workers=_COPY_WORKERS) as executor:
             for file_info in files_to_backup:
                 home_path = file_info['home_path']
-                rel_path = file_info['path']
                 
                 # Crear estructura de directorios en backup
-                backup_file_path = current_backup_dir / rel_path
+                backup_file_path = current_backup_dir / file_info['path']
                 backup_file_path.parent.mkdir(parents=True, exist_ok=True)
                 
+                futures, dirs, error = [], [], None
+                label = "FILE: "  # Definido aunque is_dir() falle
                 try:
                     if home_path.is_dir():
-                        shutil.copytree(home_path, backup_file_path, dirs_exist_ok=True)
-                        f.write(f"DIR:  {rel_path}\n")
+                        label = "DIR:  "
+                        futures, dirs = self._submit_copytree(executor, home_path, backup_file_path)
                     else:
-                        shutil.copy2(home_path, backup_file_path)
-                        f.write(f"FILE: {rel_path}\n")
-                    
-                    logger.info(f"Backup creado: {home_path} -> {backup_file_path}")
-                    
+                        futures = [executor.submit(shutil.copy2, home_path, backup_file_path)]
                 except Exception as e:
-                    logger.error(f"Error creando backup para {home_path}: {e}")
-                    f.write(f"ERROR: {rel_path} - {e}\n")
+                    error = e
+                
+                queued.append((file_info, label, futures, dirs, error))
+        
+        for file_info, label, futures, dirs, error in queued:
+            home_path = file_info['home_path']
+            rel_path = file_info['path']
+            
+            try:
+                if error:
+                    raise error
+                for future in futures:
+                    future.result()
+                self._copy_dir_stats(dirs)
+                
+                lines.append(f"{label}{rel_path}\n")
+                copied += 1
+                
+            except Exception as e:
+                logger.error(f"Error creando backup para {home_path}: {e}")
+                lines.append(f"ERROR: {rel_path} - {e}\n")
+        
+        # Escribir los metadatos de una sola vez, después de todas las copias
+        metadata_file = current_backup_dir / "backup_metadata.txt"
+        with open(metadata_file, 'w') as f:
+            f.write("".join(lines))
+        
+        logger.info(f"Backup creado: {copied} elementos copiados en {current_backup_dir}")
         
         print(f"✅ Backup creado: {current_backup_dir}")
         return backup_name
@@ -142,6 +222,44 @@ class DeployCommand:
                 success = False
         
         return success
+        
+        # Las rutas dentro de otra que también se elimina se borran primero y en serie,
+        # para que no compitan con el rmtree del padre; el resto se borra en paralelo
+        to_remove = {str(file_info['home_path']) for file_info in files_to_remove}
+        parallel = []
+        errors = {}
+        for file_info in files_to_remove:
+            if any(str(parent) in to_remove for parent in file_info['home_path'].parents):
+                try:
+                    _remove_path(file_info['home_path'])
+                except Exception as e:
+                    errors[id(file_info)] = e
+            else:
+                parallel.append(file_info)
+        
+        with ThreadPoolExecutor(max_workers=_REMOVE_WORKERS) as executor:
+            futures = {id(file_info): executor.submit(_remove_path, file_info['home_path']) for file_info in parallel}
+        
+        # Informar en el orden original de la lista
+        for file_info in files_to_remove:
+            home_path = file_info['home_path']
+            rel_path = file_info['path']
+            
+            try:
+                if id(file_info) in errors:
+                    raise errors[id(file_info)]
+                if id(file_info) in futures:
+                    futures[id(file_info)].result()
+                
+                logger.info(f"Archivo conflictivo eliminado: {home_path}")
+                print(f"🗑️  Eliminado: {rel_path}")
+                
+            except Exception as e:
+                logger.error(f"Error eliminando {home_path}: {e}")
+                print(f"❌ Error eliminando {rel_path}: {e}")
+                success = False
+        
+        return success
     
     def deploy_symlinks(self) -> bool:
         """Desplegar symlinks usando Stow"""
@@ -170,7 +288,7 @@ class DeployCommand:
         """Hacer rollback desde un backup específico o el más reciente"""
         if not backup_name:
             # Usar el backup más reciente
-            backups = sorted([d for d in self.backup_dir.iterdir() if d.is_dir() and d.name.startswith("backup_")])
+            backups = self._scan_backups()
             if not backups:
                 print("❌ No hay backups disponibles para rollback")
                 return False
@@ -188,7 +306,7 @@ class DeployCommand:
         if metadata_file.exists():
             print(f"📋 Información del backup:")
             with open(metadata_file, 'r') as f:
-                for line in f.readlines()[:4]:  # Primeras 4 líneas
+                for line in islice(f, 4):  # Primeras 4 líneas
                     print(f"   {line.strip()}")
         
         if self.dry_run:
@@ -220,7 +338,7 @@ class DeployCommand:
                 # Restaurar desde backup
                 target_path.parent.mkdir(parents=True, exist_ok=True)
                 if item.is_dir():
-                    shutil.copytree(item, target_path)
+                    self._fast_copytree(item, target_path)
                 else:
                     shutil.copy2(item, target_path)
                 
@@ -240,7 +358,7 @@ class DeployCommand:
     
     def list_backups(self) -> None:
         """Listar backups disponibles"""
-        backups = sorted([d for d in self.backup_dir.iterdir() if d.is_dir() and d.name.startswith("backup_")])
+        backups = self._scan_backups()
         
         if not backups:
             print("📁 No hay backups disponibles")
@@ -251,10 +369,11 @@ class DeployCommand:
         print()
         
         for backup in backups:
-            metadata_file = backup / "backup_metadata.txt"
+            metadata_file = Path(backup.path) / "backup_metadata.txt"
             if metadata_file.exists():
                 with open(metadata_file, 'r') as f:
-                    lines = f.readlines()
+                    # Solo hacen falta las 3 primeras líneas de la cabecera
+                    lines = list(islice(f, 3))
                     created = lines[0].strip().split(': ', 1)[1] if len(lines) > 0 else "Unknown"
                     file_count = lines[2].strip().split(': ', 1)[1] if len(lines) > 2 else "Unknown"
                 
@@ -263,6 +382,17 @@ class DeployCommand:
                 print(f"      Archivos: {file_count}")
                 print()
     
+    def _scan_backups(self) -> List[os.DirEntry]:
+        """Listar los directorios de backup del más antiguo al más reciente
+        
+        El nombre lleva el timestamp (%Y%m%d_%H%M%S), así que ordenar por nombre es
+        ordenar por fecha de creación sin ningún stat extra.
+        """
+        with os.scandir(self.backup_dir) as entries:
+            backups = [e for e in entries if e.name.startswith("backup_") and e.is_dir()]
+        backups.sort(key=lambda e: e.name)
+        return backups
+    
     def run_deploy(self) -> bool:
         """Ejecutar despliegue completo con backup"""
         dry_status = " [DRY-RUN]" if self.dry_run else ""
@@ -314,6 +444,44 @@ class DeployCommand:
         
         return True
     
+    def _fast_copytree(self, src: Path, dst: Path) -> None:
+        """Copiar un árbol de directorios con scandir y copias de archivos en paralelo"""
+        with ThreadPoolExecutor(max_workers=_COPY_WORKERS) as executor:
+            futures, dirs = self._submit_copytree(executor, src, dst)
+            
+            # Propagar el primer error de copia, si lo hubo
+            for future in futures:
+                future.result()
+        
+        self._copy_dir_stats(dirs)
+    
+    def _submit_copytree(self, executor: ThreadPoolExecutor, src: Path, dst: Path) -> Tuple[List, List]:
+        """Crear la estructura de directorios y encolar en el executor la copia de cada archivo"""
+        futures = []
+        dirs = []
+        stack = [(os.fspath(src), os.fspath(dst), os.stat(src))]
+        while stack:
+            src_dir, dst_dir, dir_stat = stack.pop()
+            os.makedirs(dst_dir, exist_ok=True)
+            dirs.append((dst_dir, dir_stat))
+            
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    # Como copytree por defecto: se siguen los symlinks y se copia su contenido
+                    target = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir():
+                        stack.append((entry.path, target, entry.stat()))
+                    else:
+                        futures.append(executor.submit(_copy_file, entry.path, target, entry.stat()))
+        
+        return futures, dirs
+    
+    def _copy_dir_stats(self, dirs: List) -> None:
+        """Aplicar permisos y tiempos a los directorios copiados, al final para que las copias no alteren el mtime"""
+        for dst_dir, dir_stat in reversed(dirs):
+            os.chmod(dst_dir, stat.S_IMODE(dir_stat.st_mode))
+            os.utime(dst_dir, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+    
     def _get_managed_paths(self) -> List[Dict]:
         """Obtener todas las rutas gestionadas"""
         return self.path_utils.get_managed_paths(include_system_configs=False)
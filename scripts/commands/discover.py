@@ -7,7 +7,7 @@ Comando interactivo para descubrir y gestionar archivos no sincronizados.
 import os
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +18,41 @@ class DiscoverCommand:
         self.config = config_manager
         self.ignore = ignore_manager
         self.home_dir = home_dir
+        self._managed_trie = {}
     
-    def scan_unmanaged_paths(self) -> List[Path]:
-        """Escanear $HOME en busca de archivos/carpetas no gestionados"""
+    def _build_managed_trie(self, managed_paths) -> dict:
+        """Construir un trie por componentes con las rutas gestionadas (None marca el final de una ruta)"""
+        trie = {}
+        for managed_path in managed_paths:
+            node = trie
+            for component in managed_path.rstrip('/').split('/'):
+                node = node.setdefault(component, {})
+            node[None] = True
+        return trie
+    
+    def _is_inside_managed(self, path: str) -> bool:
+        """Verificar si la ruta cuelga de alguna ruta gestionada (prefijo de componentes estricto)"""
+        node = self._managed_trie
+        components = path.split('/')
+        for component in components[:-1]:
+            node = node.get(component)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+    
+    def scan_unmanaged_paths(self) -> List[Tuple[Path, bool]]:
+        """Escanear $HOME en busca de archivos/carpetas no gestionados
+        
+        Returns:
+            List[Tuple[Path, bool]]: (ruta, es_directorio) con el tipo ya obtenido del escaneo
+        """
         unmanaged = []
         
         # Obtener rutas actualmente gestionadas
         managed_paths = set()
+        normalize_path = self.config.normalize_path
         
         # Rutas de common (todo $HOME está gestionado si common contiene "")
         common_paths = self.config.get_common_paths()
@@ -33,37 +61,89 @@ class DiscoverCommand:
             base_managed = True
         else:
             base_managed = False
-            for path in common_paths:
-                managed_paths.add(self.config.normalize_path(path))
+            managed_paths.update(normalize_path(path) for path in common_paths)
         
         # Rutas específicas del hostname
         hostname_paths = self.config.get_hostname_paths(self.ignore.hostname)
-        for path in hostname_paths:
-            managed_paths.add(self.config.normalize_path(path))
+        normalized_hostname_paths = [normalize_path(path) for path in hostname_paths]
+        managed_paths.update(normalized_hostname_paths)
+        
+        # Precompilar las comprobaciones por ruta: una sola regex ignore y tuplas de prefijos
+        ignore_match = self.ignore.compile_ignore_regex().match
+        self._managed_trie = self._build_managed_trie(managed_paths)
+        is_inside_managed = self._is_inside_managed
+        
+        # Equivalente a is_explicitly_included: coincidencia exacta o dentro de carpeta terminada en '/'
+        included_paths = set(normalized_hostname_paths)
+        included_prefixes = tuple(path for path in normalized_hostname_paths if path.endswith('/'))
+        
+        def is_ignored(path: str) -> bool:
+            return ignore_match(normalize_path(path).replace('\\', '/')) is not None
+        
+        # Carpetas cuyo contenido está gestionado entero: se listan pero no se recorren
+        if base_managed:
+            def is_fully_managed(dir_path: str) -> bool:
+                return normalize_path(dir_path + '/').startswith(included_prefixes)
+        else:
+            def is_fully_managed(dir_path: str) -> bool:
+                return is_inside_managed(dir_path + '/')
         
-        # Escanear $HOME
-        for root, dirs, files in os.walk(self.home_dir):
+        # Escanear $HOME con scandir en el mismo orden que os.walk; cada DirEntry
+        # conserva el tipo de archivo, así que no hace falta volver a hacer stat
+        home_prefix_len = len(os.path.join(os.fspath(self.home_dir), ''))
+        stack = [os.fspath(self.home_dir)]
+        
+        # Funciones usadas en cada entrada, enlazadas a variables locales
+        scandir = os.scandir
+        path_exists = os.path.exists
+        add_unmanaged = unmanaged.append
+        
+        while stack:
+            try:
+                with scandir(stack.pop()) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            
+            dir_entries = []
+            file_entries = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dir_entries.append(entry)
+                else:
+                    file_entries.append((entry, False))
+            
             # Excluir directorios que no queremos escanear
             # 1. Directorios de sistema (git, cache, trash)
             # 2. Directorios que coinciden con patrones ignore
-            filtered_dirs = []
-            for d in dirs:
-                if d.startswith('.git') or d in ['.cache', '.local/share/Trash']:
+            # 3. Directorios ya gestionados por completo (solo se evita descender)
+            listed_dirs = []
+            descend_dirs = []
+            for entry in dir_entries:
+                name = entry.name
+                if name.startswith('.git') or name == '.cache':
                     continue
                 
                 # Verificar si el directorio está en ignore
-                dir_path = Path(root) / d
-                relative_dir_path = str(dir_path.relative_to(self.home_dir))
+                relative_dir_path = entry.path[home_prefix_len:]
+                
+                if relative_dir_path == '.local/share/Trash' or is_ignored(relative_dir_path):
+                    continue
                 
-                if not self.ignore.should_ignore_path(relative_dir_path):
-                    filtered_dirs.append(d)
+                listed_dirs.append((entry, True))
+                # Como os.walk, no se siguen symlinks a directorios
+                if not is_fully_managed(relative_dir_path) and not entry.is_symlink():
+                    descend_dirs.append(entry.path)
             
-            dirs[:] = filtered_dirs
+            stack.extend(reversed(descend_dirs))
             
-            for item in dirs + files:
-                item_path = Path(root) / item
-                relative_path = item_path.relative_to(self.home_dir)
-                normalized_path = str(relative_path)
+            for entry, is_dir in listed_dirs + file_entries:
+                item_path = entry.path
+                normalized_path = item_path[home_prefix_len:]
                 
                 # Verificar si está gestionado
                 is_managed = False
@@ -71,28 +151,26 @@ class DiscoverCommand:
                 if base_managed:
                     # Si common gestiona todo, solo mostrar archivos que NO están en ignore
                     # y que NO están explícitamente en hostname
-                    is_explicitly_managed = self.ignore.is_explicitly_included(normalized_path)
-                    is_ignored = self.ignore.should_ignore_path(normalized_path)
+                    config_path = normalize_path(normalized_path)
+                    is_explicitly_managed = (config_path in included_paths or
+                                             config_path.startswith(included_prefixes))
                     
                     # Considerar "gestionado" si:
                     # 1. Está explícitamente incluido en hostname, O
                     # 2. Está en ignore (no queremos mostrarlo)
-                    is_managed = is_explicitly_managed or is_ignored
+                    is_managed = is_explicitly_managed or is_ignored(normalized_path)
                 else:
-                    # Verificar si coincide con alguna ruta gestionada
-                    for managed_path in managed_paths:
-                        if (normalized_path == managed_path or 
-                            normalized_path.startswith(managed_path.rstrip('/') + '/') or
-                            managed_path.endswith('/') and normalized_path.startswith(managed_path)):
-                            is_managed = True
-                            break
+                    # Verificar si coincide con alguna ruta gestionada (exacta o dentro de ella, vía trie)
+                    is_managed = (normalized_path in managed_paths or
+                                  is_inside_managed(normalized_path))
                     
                     # También verificar si está en ignore (no queremos mostrarlo)
                     if not is_managed:
-                        is_managed = self.ignore.should_ignore_path(normalized_path)
+                        is_managed = is_ignored(normalized_path)
                 
-                if not is_managed and item_path.exists():
-                    unmanaged.append(item_path)
+                # Los symlinks rotos no cuentan (solo ellos necesitan un stat extra)
+                if not is_managed and (not entry.is_symlink() or path_exists(item_path)):
+                    add_unmanaged((Path(item_path), is_dir))
         
         return unmanaged
 
@@ -107,19 +185,23 @@ class DiscoverCommand:
         
         print(f"📁 Encontrados {len(unmanaged)} elementos no gestionados")
         
+        hostname = self.ignore.hostname
         additions = {
             'common': [],
-            self.ignore.hostname: [],
+            hostname: [],
             'ignore': []
         }
         
-        for item_path in unmanaged[:20]:  # Limitar a primeros 20 para no abrumar
-            relative_path = item_path.relative_to(self.home_dir)
+        # Ruta relativa a $HOME por corte de cadena (todas las rutas cuelgan de home_dir)
+        home_prefix_len = len(os.path.join(os.fspath(self.home_dir), ''))
+        
+        for item_path, is_dir in unmanaged[:20]:  # Limitar a primeros 20 para no abrumar
+            relative_path = os.fspath(item_path)[home_prefix_len:]
             
             print(f"\n📄 {relative_path}")
             print("¿Qué hacer con este elemento?")
             print("  [c] Agregar a COMMON (sincronizar en todos los equipos)")
-            print(f"  [h] Agregar a {self.ignore.hostname.upper()} (solo este equipo)")
+            print(f"  [h] Agregar a {hostname.upper()} (solo este equipo)")
             print("  [i] IGNORE (no sincronizar nunca)")
             print("  [s] SKIP (omitir por ahora)")
             
@@ -130,15 +212,15 @@ class DiscoverCommand:
                 print("Opción inválida. Use c, h, i o s.")
             
             if choice == 'c':
-                additions['common'].append(str(relative_path))
+                additions['common'].append(relative_path)
                 print(f"✅ Agregado a common: {relative_path}")
             elif choice == 'h':
-                additions[self.ignore.hostname].append(str(relative_path))
-                print(f"✅ Agregado a {self.ignore.hostname}: {relative_path}")
+                additions[hostname].append(relative_path)
+                print(f"✅ Agregado a {hostname}: {relative_path}")
             elif choice == 'i':
                 # Para carpetas, agregar patrón con /**
-                pattern = str(relative_path)
-                if item_path.is_dir():
+                pattern = relative_path
+                if is_dir:
                     pattern += "/**"
                 additions['ignore'].append(pattern)
                 print(f"✅ Agregado a ignore: {pattern}")
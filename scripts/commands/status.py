@@ -4,8 +4,10 @@ Sync-Arch Status Command
 Comando para mostrar estado del repositorio y configuración.
 """
 
+import sys
 import logging
 from pathlib import Path
+from typing import Dict, List
 
 logger = logging.getLogger(__name__)
 
@@ -19,99 +21,115 @@ class StatusCommand:
     
     def show_status(self) -> None:
         """Mostrar estado completo del sistema"""
-        print("📊 Estado de Sync-Arch")
-        print("=" * 50)
+        lines = ["📊 Estado de Sync-Arch", "=" * 50]
+        
+        # Leer la configuración una sola vez para todas las secciones
+        snapshot = {
+            'common': self.config.get_common_paths(),
+            'hostname': self.config.get_hostname_paths(self.ignore.hostname),
+            'ignore': self.config.get_ignore_patterns(),
+            'system': self.config.get_system_configs()
+        }
         
         # Información básica
-        self._show_basic_info()
+        lines.extend(self._format_basic_info())
         
         # Estado Git
-        self._show_git_status()
+        lines.extend(self._format_git_status())
         
         # Configuración
-        self._show_config_summary()
+        lines.extend(self._format_config_summary(snapshot))
         
         # Rutas gestionadas
-        self._show_managed_paths()
+        lines.extend(self._format_managed_paths(snapshot))
+        
+        # Toda la salida se escribe de una vez
+        sys.stdout.write("\n".join(lines) + "\n")
     
-    def _show_basic_info(self) -> None:
-        """Mostrar información básica"""
-        print(f"\n🖥️  Hostname: {self.ignore.hostname}")
-        print(f"📁 Home: {Path.home()}")
-        print(f"⚙️  Config: {self.config.config}")
+    def _format_basic_info(self) -> List[str]:
+        """Líneas con la información básica"""
+        return [
+            f"\n🖥️  Hostname: {self.ignore.hostname}",
+            f"📁 Home: {Path.home()}",
+            f"⚙️  Config: {self.config.config}"
+        ]
     
-    def _show_git_status(self) -> None:
-        """Mostrar estado de Git"""
-        print(f"\n📡 Estado Git:")
+    def _format_git_status(self) -> List[str]:
+        """Líneas con el estado de Git"""
+        lines = [f"\n📡 Estado Git:"]
         
         git_status = self.git_ops.get_status()
         
         if 'error' in git_status:
-            print(f"❌ Error: {git_status['error']}")
-            return
+            lines.append(f"❌ Error: {git_status['error']}")
+            return lines
         
-        print(f"   Branch: {git_status['branch']}")
-        print(f"   Último commit: {git_status['last_commit']}")
-        print(f"   Cambios pendientes: {'Sí' if git_status['has_changes'] else 'No'}")
+        lines.append(f"   Branch: {git_status['branch']}")
+        lines.append(f"   Último commit: {git_status['last_commit']}")
+        lines.append(f"   Cambios pendientes: {'Sí' if git_status['has_changes'] else 'No'}")
         
         if git_status['has_changes']:
-            print(f"\n📝 Cambios pendientes:")
+            lines.append(f"\n📝 Cambios pendientes:")
             for line in git_status['status_output'].strip().split('\n'):
                 if line.strip():
-                    print(f"   {line}")
+                    lines.append(f"   {line}")
+        
+        return lines
     
-    def _show_config_summary(self) -> None:
-        """Mostrar resumen de configuración"""
-        print(f"\n⚙️  Configuración:")
-        
-        common_paths = self.config.get_common_paths()
-        hostname_paths = self.config.get_hostname_paths(self.ignore.hostname)
-        ignore_patterns = self.config.get_ignore_patterns()
-        system_configs = self.config.get_system_configs()
-        
-        print(f"   Common: {len(common_paths)} rutas")
-        print(f"   {self.ignore.hostname}: {len(hostname_paths)} rutas")
-        print(f"   Ignore: {len(ignore_patterns)} patrones")
-        print(f"   System: {len(system_configs)} configs")
+    def _format_config_summary(self, snapshot: Dict[str, list]) -> List[str]:
+        """Líneas con el resumen de configuración"""
+        common_paths = snapshot['common']
+        hostname_paths = snapshot['hostname']
+        ignore_patterns = snapshot['ignore']
+        system_configs = snapshot['system']
+        
+        return [
+            f"\n⚙️  Configuración:",
+            f"   Common: {len(common_paths)} rutas",
+            f"   {self.ignore.hostname}: {len(hostname_paths)} rutas",
+            f"   Ignore: {len(ignore_patterns)} patrones",
+            f"   System: {len(system_configs)} configs"
+        ]
     
-    def _show_managed_paths(self) -> None:
-        """Mostrar rutas gestionadas"""
-        print(f"\n📂 Rutas Gestionadas:")
+    def _format_managed_paths(self, snapshot: Dict[str, list]) -> List[str]:
+        """Líneas con las rutas gestionadas"""
+        lines = [f"\n📂 Rutas Gestionadas:"]
         
         # Common paths
-        common_paths = self.config.get_common_paths()
+        common_paths = snapshot['common']
         if common_paths:
-            print(f"\n   📋 Common ({len(common_paths)}):")
+            lines.append(f"\n   📋 Common ({len(common_paths)}):")
             for path in common_paths[:5]:  # Mostrar primeras 5
-                print(f"      • {path}")
+                lines.append(f"      • {path}")
             if len(common_paths) > 5:
-                print(f"      ... y {len(common_paths) - 5} más")
+                lines.append(f"      ... y {len(common_paths) - 5} más")
         
         # Hostname specific paths
-        hostname_paths = self.config.get_hostname_paths(self.ignore.hostname)
+        hostname_paths = snapshot['hostname']
         if hostname_paths:
-            print(f"\n   🖥️  {self.ignore.hostname} ({len(hostname_paths)}):")
+            lines.append(f"\n   🖥️  {self.ignore.hostname} ({len(hostname_paths)}):")
             for path in hostname_paths[:5]:  # Mostrar primeras 5
-                print(f"      • {path}")
+                lines.append(f"      • {path}")
             if len(hostname_paths) > 5:
-                print(f"      ... y {len(hostname_paths) - 5} más")
+                lines.append(f"      ... y {len(hostname_paths) - 5} más")
         
         # Ignore patterns
-        ignore_patterns = self.config.get_ignore_patterns()
+        ignore_patterns = snapshot['ignore']
         if ignore_patterns:
-            print(f"\n   🚫 Ignore ({len(ignore_patterns)}):")
+            lines.append(f"\n   🚫 Ignore ({len(ignore_patterns)}):")
             for pattern in ignore_patterns[:5]:  # Mostrar primeros 5
-                print(f"      • {pattern}")
+                lines.append(f"      • {pattern}")
             if len(ignore_patterns) > 5:
-                print(f"      ... y {len(ignore_patterns) - 5} más")
+                lines.append(f"      ... y {len(ignore_patterns) - 5} más")
         
         # System configs
-        system_configs = self.config.get_system_configs()
+        system_configs = snapshot['system']
         if system_configs:
-            print(f"\n   🔧 System ({len(system_configs)}):")
+            lines.append(f"\n   🔧 System ({len(system_configs)}):")
             for config in system_configs[:3]:  # Mostrar primeros 3
-                print(f"      • {config}")
+                lines.append(f"      • {config}")
             if len(system_configs) > 3:
-                print(f"      ... y {len(system_configs) - 3} más")
+                lines.append(f"      ... y {len(system_configs) - 3} más")
         
-        print()  # Línea en blanco al final
+        lines.append("")  # Línea en blanco al final
+        return lines
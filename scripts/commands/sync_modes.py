@@ -21,10 +21,8 @@ class SyncModes:
         self.conflicts = conflict_resolver
         self.force_overwrite = force_overwrite
     
-    def startup_sync(self) -> bool:
-        """Sincronización al inicio del sistema"""
-        logger.info("=== INICIO: Sincronización de startup ===")
-        
+    def _sync_from_remote_and_stow(self) -> bool:
+        """Paso común de startup y manual: pull de Git, resolución de conflictos y stow"""
         # Sincronizar desde Git primero
         if not self.git_ops.sync_from_git():
             return False
@@ -45,7 +43,14 @@ class SyncModes:
         if self.ignore.hostname in self.config.config:
             packages.append(self.ignore.hostname)
         
-        success = self.stow_ops.apply_stow(packages)
+        return self.stow_ops.apply_stow(packages)
+    
+    def startup_sync(self) -> bool:
+        """Sincronización al inicio del sistema"""
+        logger.info("=== INICIO: Sincronización de startup ===")
+        
+        # Traer cambios de Git, resolver conflictos y aplicar stow
+        success = self._sync_from_remote_and_stow()
         
         if success:
             logger.info("=== FIN: Sincronización de startup completada ===")
@@ -74,35 +79,15 @@ class SyncModes:
         
         # Verificar cambios antes de proceder si no es forzado
         if not force:
-            has_local = self.git_ops.has_local_changes()
-            has_remote = self.git_ops.has_remote_changes()
+            has_local, has_remote = self.git_ops.probe_changes()
             
             if not has_local and not has_remote:
                 logger.info("No hay cambios para sincronizar")
                 logger.info("=== FIN: Sincronización manual (sin cambios) ===")
                 return True
         
-        # Sincronizar desde Git primero
-        if not self.git_ops.sync_from_git():
-            return False
-        
-        # Detectar y resolver conflictos de carpetas
-        conflicts = self.conflicts.detect_conflicts()
-        if conflicts:
-            if not self.conflicts.reorganize_conflicted_folders(conflicts):
-                return False
-        
-        # Manejar conflictos con archivos existentes
-        existing_conflicts = self.stow_ops.detect_existing_file_conflicts(self.ignore, self.config)
-        if not self.stow_ops.handle_existing_files_conflict(existing_conflicts, self.config, self.force_overwrite):
-            return False
-        
-        # Aplicar stow
-        packages = ['common']
-        if self.ignore.hostname in self.config.config:
-            packages.append(self.ignore.hostname)
-        
-        if not self.stow_ops.apply_stow(packages):
+        # Traer cambios de Git, resolver conflictos y aplicar stow
+        if not self._sync_from_remote_and_stow():
             return False
         
         # Sincronizar cambios locales a Git
@@ -6,12 +6,47 @@ pero no están correctamente sincronizados o versionados.
 """
 
 import os
+import sys
+import stat
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Tuple, Set
 
 logger = logging.getLogger(__name__)
 
+# Hilos para listar directorios en paralelo (el scandir libera el GIL mientras espera al disco)
+_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+class Issue:
+    """Problema detectado por la validación (con __slots__: sin __dict__ por instancia)"""
+    __slots__ = ('path', 'source', 'reason', 'home_path', 'repo_path', 'home_exists', 'is_symlink')
+    
+    def __init__(self, path: str, source: str, reason: str, home_path: str = '', repo_path: str = '',
+                 home_exists: bool = False, is_symlink: bool = False):
+        self.path = path
+        self.source = source
+        self.reason = reason
+        self.home_path = home_path
+        self.repo_path = repo_path
+        self.home_exists = home_exists
+        self.is_symlink = is_symlink
+
+def _join_path(base: str, relative: str) -> str:
+    """Unir rutas igual que str(Path(base) / relative) sin crear objetos Path"""
+    joined = os.path.join(base, relative)
+    # normpath también colapsa '..', que pathlib conserva
+    return str(Path(joined)) if '..' in relative else os.path.normpath(joined)
+
+def _list_dir(parent: Path):
+    """Listar un directorio como {nombre: DirEntry}, o None si no se puede listar"""
+    try:
+        with os.scandir(parent) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return None
+
 class ValidateCommand:
     """Comando de validación de sincronización"""
     
@@ -26,8 +61,15 @@ class ValidateCommand:
         # Importar PathUtils del core
         from core.path_utils import PathUtils
         self.path_utils = PathUtils(config_manager, dotfiles_dir, home_dir, self.hostname)
+        
+        # Rutas gestionadas calculadas en la primera validación (ver refresh())
+        self._managed_paths_cache = None
+    
+    def refresh(self) -> None:
+        """Descartar las rutas gestionadas memorizadas (tras cambiar config.json)"""
+        self._managed_paths_cache = None
     
-    def scan_missing_items(self) -> Dict[str, List[Dict]]:
+    def scan_missing_items(self) -> Dict[str, List[Issue]]:
         """Escanear elementos en config.json que no están correctamente sincronizados"""
         issues = {
             'missing_in_repo': [],      # En config pero no en repo
@@ -39,6 +81,11 @@ class ValidateCommand:
         # Obtener todas las rutas gestionadas
         managed_paths = self.get_all_managed_paths()
         
+        # Primera pasada: descartar las huérfanas y reunir las rutas a comprobar
+        # (como cadenas: las bases se convierten una vez y pathlib queda fuera del bucle)
+        to_check = []
+        home_str = str(self.home_dir)
+        repo_bases = {}
         for key, path_info in managed_paths.items():
             path = path_info['path']
             normalized_path = path_info['normalized']
@@ -48,182 +95,260 @@ class ValidateCommand:
             if self.ignore.should_ignore_path(normalized_path):
                 # Solo reportar si no está explícitamente incluido en hostname
                 if not self.ignore.is_explicitly_included(normalized_path):
-                    issues['orphaned_config'].append({
-                        'path': path,
-                        'source': source,
-                        'reason': f'Coincide con patrón ignore pero está en {source}'
-                    })
+                    issues['orphaned_config'].append(Issue(
+                        path=path,
+                        source=source,
+                        reason=f'Coincide con patrón ignore pero está en {source}'
+                    ))
                     continue
             
+            repo_base = repo_bases.get(source)
+            if repo_base is None:
+                repo_base = repo_bases[source] = str(self.get_repo_path(source, ''))
+            to_check.append((path_info, _join_path(repo_base, normalized_path), _join_path(home_str, normalized_path)))
+        
+        # Resoluciones memorizadas solo durante este escaneo
+        self.path_utils.clear_resolve_cache()
+        resolve_cached = self.path_utils.resolve_cached
+        
+        # Un scandir por directorio padre da el tipo de todas las rutas sin un stat por ruta
+        entries = self._lookup_entries([repo for _, repo, _ in to_check] + [home for _, _, home in to_check])
+        
+        for path_info, repo_path, home_path in to_check:
+            path = path_info['path']
+            source = path_info['source']
+            
             # Verificar existencia en repo
-            repo_path = self.get_repo_path(source, normalized_path)
-            repo_exists = repo_path.exists()
+            repo_exists, _ = self._path_state(entries, repo_path)
             
             # Verificar existencia en $HOME
-            home_path = self.home_dir / normalized_path
-            home_exists = home_path.exists()
+            home_exists, home_is_symlink = self._path_state(entries, home_path)
             
-            # Verificar si es symlink correcto
+            # Verificar si es symlink correcto (solo los symlinks necesitan comprobarse)
             is_correct_symlink = (home_exists and 
-                                home_path.is_symlink() and 
-                                home_path.resolve() == repo_path.resolve())
+                                home_is_symlink and 
+                                self._links_to(home_path, repo_path, resolve_cached))
             
             # Clasificar el problema
             if not repo_exists and not home_exists:
                 # No existe en ningún lado
-                issues['missing_everywhere'].append({
-                    'path': path,
-                    'source': source,
-                    'reason': 'Especificado en config pero no existe'
-                })
+                issues['missing_everywhere'].append(Issue(
+                    path=path,
+                    source=source,
+                    reason='Especificado en config pero no existe'
+                ))
             elif not repo_exists and home_exists:
                 # Existe en HOME pero no en repo
-                issues['missing_in_repo'].append({
-                    'path': path,
-                    'source': source,
-                    'home_path': str(home_path),
-                    'repo_path': str(repo_path),
-                    'reason': 'Existe en $HOME pero no está versionado'
-                })
+                issues['missing_in_repo'].append(Issue(
+                    path=path,
+                    source=source,
+                    home_path=home_path,
+                    repo_path=repo_path,
+                    reason='Existe en $HOME pero no está versionado'
+                ))
             elif repo_exists and not is_correct_symlink:
                 # Existe en repo pero sin symlink correcto
-                if home_exists and not home_path.is_symlink():
+                if home_exists and not home_is_symlink:
                     reason = 'Archivo real en $HOME, necesita ser reemplazado por symlink'
-                elif home_exists and home_path.is_symlink():
+                elif home_exists and home_is_symlink:
                     reason = 'Symlink incorrecto en $HOME'
                 else:
                     reason = 'Versionado pero no desplegado en $HOME'
                 
-                issues['missing_symlinks'].append({
-                    'path': path,
-                    'source': source,
-                    'home_path': str(home_path),
-                    'repo_path': str(repo_path),
-                    'home_exists': home_exists,
-                    'is_symlink': home_path.is_symlink() if home_exists else False,
-                    'reason': reason
-                })
+                issues['missing_symlinks'].append(Issue(
+                    path=path,
+                    source=source,
+                    home_path=home_path,
+                    repo_path=repo_path,
+                    home_exists=home_exists,
+                    is_symlink=home_is_symlink if home_exists else False,
+                    reason=reason
+                ))
         
         return issues
     
-    def get_all_managed_paths(self) -> Dict[str, Dict]:
-        """Obtener todas las rutas gestionadas desde config.json"""
+    def _links_to(self, link_path: str, target_path: str, resolve_cached) -> bool:
+        """Verificar si el symlink apunta a target_path (readlink primero, resolve solo si no coincide literalmente)"""
+        try:
+            if os.path.isabs(target_path) and os.readlink(link_path) == target_path:
+                return True
+        except OSError:
+            pass
+        return resolve_cached(link_path) == resolve_cached(target_path)
+    
+    def _lookup_entries(self, paths: List[str]) -> Dict[str, os.DirEntry]:
+        """Obtener el DirEntry de cada ruta con un solo scandir por directorio padre
+        
+        Las rutas cuyo padre no se puede listar (o sin nombre listable, como '..')
+        quedan fuera del resultado y se comprueban con lstat.
+        """
+        by_parent = defaultdict(list)
+        for path in paths:
+            parent, name = os.path.split(path)
+            if name not in ('', '..'):
+                by_parent[parent].append((path, name))
+        
+        # Los directorios se listan en paralelo; map conserva el orden y la
+        # clasificación posterior sigue en el hilo principal
+        if len(by_parent) > 1:
+            with ThreadPoolExecutor(max_workers=min(_SCAN_WORKERS, len(by_parent))) as executor:
+                listings = list(executor.map(_list_dir, by_parent))
+        else:
+            listings = [_list_dir(parent) for parent in by_parent]
+        
+        entries = {}
+        for listing, children in zip(listings, by_parent.values()):
+            if listing is None:
+                continue
+            for path, name in children:
+                entries[path] = listing.get(name)
+        return entries
+    
+    def _path_state(self, entries: Dict[str, os.DirEntry], path: str) -> Tuple[bool, bool]:
+        """Obtener (existe, es_symlink) como path.exists()/path.is_symlink() con un solo lstat como máximo"""
+        if path in entries:
+            entry = entries[path]
+            if entry is None:
+                return False, False
+            is_symlink = entry.is_symlink()
+        else:
+            try:
+                is_symlink = stat.S_ISLNK(os.lstat(path).st_mode)
+            except OSError:
+                return False, False
+        # Solo un symlink necesita stat para saber si su destino existe
+        return (not is_symlink or os.path.exists(path)), is_symlink
+    
+    def get_all_managed_paths(self) -> Dict[Tuple[str, str], Dict]:
+        """Obtener todas las rutas gestionadas desde config.json (memorizadas hasta refresh())"""
+        if self._managed_paths_cache is not None:
+            return self._managed_paths_cache
+        
         managed_paths = {}
         
         # Usar la función centralizada de path_utils
         paths_list = self.path_utils.get_managed_paths(include_system_configs=False)
         
-        # Convertir a formato de dict con keys únicos para compatibilidad
+        # Convertir a formato de dict con keys únicos (source, path)
         for path_info in paths_list:
-            key = f"{path_info['source']}:{path_info['path']}"
-            managed_paths[key] = path_info
-            
+            managed_paths[(path_info['source'], path_info['path'])] = path_info
+        
+        self._managed_paths_cache = managed_paths
         return managed_paths
     
     def get_repo_path(self, source: str, normalized_path: str) -> Path:
         """Obtener la ruta en el repositorio para un archivo"""
         return self.path_utils.get_repo_path(source, normalized_path)
     
-    def show_validation_report(self, issues: Dict[str, List[Dict]]) -> None:
+    def show_validation_report(self, issues: Dict[str, List[Issue]]) -> None:
         """Mostrar reporte de validación"""
+        sys.stdout.write("\n".join(self._format_validation_report(issues)) + "\n")
+    
+    def _format_validation_report(self, issues: Dict[str, List[Issue]]) -> List[str]:
+        """Formatear el reporte de validación como líneas (se escriben de una sola vez)"""
         total_issues = sum(len(issue_list) for issue_list in issues.values())
         
         if total_issues == 0:
-            print("✅ Validación completa: todos los elementos en config.json están correctamente sincronizados")
-            return
+            return ["✅ Validación completa: todos los elementos en config.json están correctamente sincronizados"]
         
-        print(f"🔍 REPORTE DE VALIDACIÓN - {total_issues} problemas encontrados")
-        print("=" * 60)
-        print()
+        lines = [f"🔍 REPORTE DE VALIDACIÓN - {total_issues} problemas encontrados", "=" * 60, ""]
         
         # Elementos faltantes en repositorio
         if issues['missing_in_repo']:
-            print("📁 ARCHIVOS FALTANTES EN REPOSITORIO")
-            print("   → Existen en $HOME pero no están versionados")
-            print()
+            lines.append("📁 ARCHIVOS FALTANTES EN REPOSITORIO")
+            lines.append("   → Existen en $HOME pero no están versionados")
+            lines.append("")
             for item in issues['missing_in_repo']:
-                print(f"   • {item['path']} ({item['source']})")
-                print(f"     $HOME: {item['home_path']} ✅")
-                print(f"     Repo:  {item['repo_path']} ❌")
-                print(f"     💡 Solución: Agregar al repositorio")
-                print()
+                lines.append(f"   • {item.path} ({item.source})")
+                lines.append(f"     $HOME: {item.home_path} ✅")
+                lines.append(f"     Repo:  {item.repo_path} ❌")
+                lines.append(f"     💡 Solución: Agregar al repositorio")
+                lines.append("")
         
         # Symlinks faltantes
         if issues['missing_symlinks']:
-            print("🔗 SYMLINKS FALTANTES O INCORRECTOS")
-            print("   → Versionados pero no desplegados correctamente")
-            print()
+            lines.append("🔗 SYMLINKS FALTANTES O INCORRECTOS")
+            lines.append("   → Versionados pero no desplegados correctamente")
+            lines.append("")
             for item in issues['missing_symlinks']:
-                print(f"   • {item['path']} ({item['source']})")
-                print(f"     $HOME: {item['home_path']} {'✅' if item['home_exists'] else '❌'}")
-                print(f"     Repo:  {item['repo_path']} ✅")
-                if item['home_exists']:
-                    print(f"     Tipo:  {'Symlink' if item['is_symlink'] else 'Archivo real'}")
-                print(f"     💡 Solución: {item['reason']}")
-                print()
+                lines.append(f"   • {item.path} ({item.source})")
+                lines.append(f"     $HOME: {item.home_path} {'✅' if item.home_exists else '❌'}")
+                lines.append(f"     Repo:  {item.repo_path} ✅")
+                if item.home_exists:
+                    lines.append(f"     Tipo:  {'Symlink' if item.is_symlink else 'Archivo real'}")
+                lines.append(f"     💡 Solución: {item.reason}")
+                lines.append("")
         
         # Elementos que no existen en ningún lado
         if issues['missing_everywhere']:
-            print("❓ ENTRADAS OBSOLETAS EN CONFIG")
-            print("   → Especificadas pero no existen")
-            print()
+            lines.append("❓ ENTRADAS OBSOLETAS EN CONFIG")
+            lines.append("   → Especificadas pero no existen")
+            lines.append("")
             for item in issues['missing_everywhere']:
-                print(f"   • {item['path']} ({item['source']})")
-                print(f"     💡 Solución: Remover de config.json o crear el archivo")
-                print()
+                lines.append(f"   • {item.path} ({item.source})")
+                lines.append(f"     💡 Solución: Remover de config.json o crear el archivo")
+                lines.append("")
         
         # Configuraciones huérfanas (en ignore)
         if issues['orphaned_config']:
-            print("⚠️  CONFIGURACIONES CONFLICTIVAS")
-            print("   → En config pero coinciden con patrones ignore")
-            print()
+            lines.append("⚠️  CONFIGURACIONES CONFLICTIVAS")
+            lines.append("   → En config pero coinciden con patrones ignore")
+            lines.append("")
             for item in issues['orphaned_config']:
-                print(f"   • {item['path']} ({item['source']})")
-                print(f"     💡 {item['reason']}")
-                print()
+                lines.append(f"   • {item.path} ({item.source})")
+                lines.append(f"     💡 {item.reason}")
+                lines.append("")
+        
+        return lines
     
-    def suggest_fixes(self, issues: Dict[str, List[Dict]]) -> None:
+    def suggest_fixes(self, issues: Dict[str, List[Issue]]) -> None:
         """Sugerir comandos para arreglar los problemas"""
+        lines = self._format_fixes(issues)
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+    
+    def _format_fixes(self, issues: Dict[str, List[Issue]]) -> List[str]:
+        """Formatear los comandos sugeridos como líneas (vacío si no hay problemas)"""
         if not any(issues.values()):
-            return
+            return []
         
-        print("🛠️  COMANDOS SUGERIDOS PARA CORREGIR")
-        print("=" * 40)
-        print()
+        lines = ["🛠️  COMANDOS SUGERIDOS PARA CORREGIR", "=" * 40, ""]
         
         # Para archivos faltantes en repo
         if issues['missing_in_repo']:
-            print("📁 Agregar archivos al repositorio:")
+            lines.append("📁 Agregar archivos al repositorio:")
             for item in issues['missing_in_repo']:
-                repo_dir = Path(item['repo_path']).parent
-                print(f"   mkdir -p {repo_dir}")
-                print(f"   cp -r {item['home_path']} {item['repo_path']}")
-            print()
+                repo_dir = Path(item.repo_path).parent
+                lines.append(f"   mkdir -p {repo_dir}")
+                lines.append(f"   cp -r {item.home_path} {item.repo_path}")
+            lines.append("")
         
         # Para symlinks faltantes
         if issues['missing_symlinks']:
-            print("🔗 Crear/corregir symlinks:")
-            print("   # Usar GNU Stow para desplegar:")
-            print("   cd dotfiles")
-            print("   stow common")
-            print(f"   stow {self.hostname}")
-            print()
+            lines.append("🔗 Crear/corregir symlinks:")
+            lines.append("   # Usar GNU Stow para desplegar:")
+            lines.append("   cd dotfiles")
+            lines.append("   stow common")
+            lines.append(f"   stow {self.hostname}")
+            lines.append("")
         
         # Para entradas obsoletas
         if issues['missing_everywhere']:
-            print("❓ Limpiar config.json:")
-            print("   # Remover estas entradas de config.json:")
+            lines.append("❓ Limpiar config.json:")
+            lines.append("   # Remover estas entradas de config.json:")
             for item in issues['missing_everywhere']:
-                print(f"   # - {item['path']} (de {item['source']})")
-            print()
+                lines.append(f"   # - {item.path} (de {item.source})")
+            lines.append("")
         
         # Para configuraciones conflictivas
         if issues['orphaned_config']:
-            print("⚠️  Resolver conflictos ignore:")
-            print("   # Opciones:")
-            print("   # 1. Remover de config.json si no debe sincronizarse")
-            print("   # 2. Ajustar patrones ignore si debe sincronizarse")
-            print()
+            lines.append("⚠️  Resolver conflictos ignore:")
+            lines.append("   # Opciones:")
+            lines.append("   # 1. Remover de config.json si no debe sincronizarse")
+            lines.append("   # 2. Ajustar patrones ignore si debe sincronizarse")
+            lines.append("")
+        
+        return lines
     
     def run_validation(self) -> bool:
         """Ejecutar validación completa"""
@@ -233,11 +358,13 @@ class ValidateCommand:
         print()
         
         issues = self.scan_missing_items()
-        self.show_validation_report(issues)
         
-        if any(issues.values()):
-            print()
-            self.suggest_fixes(issues)
-            return False
+        # Reporte y sugerencias en una sola escritura
+        lines = self._format_validation_report(issues)
+        has_issues = any(issues.values())
+        if has_issues:
+            lines.append("")
+            lines.extend(self._format_fixes(issues))
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        return True
+        return not has_issues
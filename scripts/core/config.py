@@ -6,6 +6,7 @@ Gestión centralizada de configuración del sistema.
 
 import json
 import logging
+import functools
 from pathlib import Path
 from typing import Dict, List
 
@@ -17,17 +18,31 @@ CONFIG_FILE = PROJECT_ROOT / "config.json"
 DOTFILES_DIR = PROJECT_ROOT / "dotfiles"  
 HOME = Path.home()
 
+# Secciones de config.json que no son hostnames
+_RESERVED_SECTIONS = frozenset({'common', 'ignore', 'system_configs', 'conflict_resolution'})
+
+@functools.lru_cache(maxsize=2048)
+def _normalize_path(path: str) -> str:
+    """Normalizar ruta removiendo prefijos inconsistentes (memorizado: es una función pura)"""
+    # Remover prefijo home/ si existe (para compatibilidad); las rutas relativas al HOME
+    # se devuelven tal cual, sin añadir '.'
+    if 'home/' in path:
+        return path.replace('home/', '')
+    return path
+
 class ConfigManager:
     """Gestor de configuración del sistema"""
     
     def __init__(self):
         self.config = self.load_config()
+        self._hostname_entries = None  # Caché de get_hostname_entries()
+        self.version = 0  # Se incrementa con cada cambio en memoria (para cachés derivadas)
     
     def load_config(self) -> Dict:
         """Cargar configuración desde config.json"""
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
+            # Una sola lectura en bytes; json detecta la codificación
+            config = json.loads(CONFIG_FILE.read_bytes())
             logger.debug(f"Configuración cargada desde: {CONFIG_FILE}")
             return config
         except FileNotFoundError:
@@ -40,8 +55,12 @@ class ConfigManager:
     def save_config(self) -> None:
         """Guardar configuración actual a config.json"""
         try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            # Serializar antes de abrir (un error no deja el archivo truncado) y escribir en binario de una vez;
+            # json.dump haría una escritura por fragmento a través de la capa de texto
+            data = json.dumps(self.config, indent=2).encode('utf-8')
+            with open(CONFIG_FILE, 'wb') as f:
+                f.write(data)
+            self._hostname_entries = None
             logger.debug(f"Configuración guardada en: {CONFIG_FILE}")
         except Exception as e:
             logger.error(f"Error guardando configuración: {e}")
@@ -55,6 +74,13 @@ class ConfigManager:
         """Obtener rutas específicas de hostname"""
         return self.config.get(hostname, [])
     
+    def get_hostname_entries(self) -> Dict[str, List[str]]:
+        """Obtener las secciones de hostname (todas menos las reservadas), calculadas una vez"""
+        if self._hostname_entries is None:
+            self._hostname_entries = {section: paths for section, paths in self.config.items()
+                                      if section not in _RESERVED_SECTIONS}
+        return self._hostname_entries
+    
     def get_ignore_patterns(self) -> List[str]:
         """Obtener patrones de ignore"""
         return self.config.get('ignore', [])
@@ -72,13 +98,10 @@ class ConfigManager:
         if section not in self.config:
             self.config[section] = []
         self.config[section].extend(paths)
+        self._hostname_entries = None
+        self.version += 1
         logger.debug(f"Agregadas {len(paths)} rutas a sección '{section}'")
     
     def normalize_path(self, path: str) -> str:
         """Normalizar ruta removiendo prefijos inconsistentes"""
-        # Remover prefijo home/ si existe (para compatibilidad)
-        normalized = path.replace('home/', '')
-        # Asegurar que empiece con . para rutas relativas al HOME
-        if normalized and not normalized.startswith('.') and not normalized.startswith('/'):
-            normalized = '.' + normalized if normalized.startswith('/') else normalized
-        return normalized
+        return _normalize_path(path)
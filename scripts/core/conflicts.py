@@ -4,14 +4,18 @@ Sync-Arch Conflict Resolution
 Resolución de conflictos de override parcial y reorganización de carpetas.
 """
 
+import os
 import logging
-import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple
-from .utils import run_command
+from .utils import run_command, fast_copy2
 
 logger = logging.getLogger(__name__)
 
+# Hilos para migrar archivos en paralelo (cada par origen/destino es independiente)
+_MIGRATE_WORKERS = 8
+
 class ConflictResolver:
     """Resolutor de conflictos de configuración"""
     
@@ -24,22 +28,35 @@ class ConflictResolver:
     def detect_conflicts(self) -> List[Tuple[str, str, str]]:
         """Detectar conflictos de override parcial (carpeta en common + archivo específico en host)"""
         conflicts = []
-        common_folders = [path for path in self.config.get_common_paths() if path.endswith('/')]
+        normalize_path = self.config.normalize_path
         
-        for hostname, files in self.config.config.items():
-            if hostname in ['common', 'ignore', 'system_configs', 'conflict_resolution']:
-                continue
-                
+        # Índice de prefijos: carpeta común normalizada -> [(posición, carpeta original)]
+        common_index = {}
+        for position, path in enumerate(p for p in self.config.get_common_paths() if p.endswith('/')):
+            common_index.setdefault(normalize_path(path), []).append((position, path))
+        
+        # Sin carpetas comunes no puede haber overrides parciales
+        if not common_index:
+            return conflicts
+        
+        # Solo hace falta probar los prefijos del archivo con la longitud de alguna carpeta
+        prefix_lengths = sorted({len(folder) for folder in common_index})
+        
+        for hostname, files in self.config.get_hostname_entries().items():
             for file_path in files:
-                for common_folder in common_folders:
-                    # Normalizar rutas para comparación
-                    normalized_file = self.config.normalize_path(file_path)
-                    normalized_folder = self.config.normalize_path(common_folder)
-                    
-                    # Verificar si el archivo está dentro de la carpeta común
-                    if normalized_file.startswith(normalized_folder):
-                        conflicts.append((common_folder, file_path, hostname))
-                        logger.debug(f"Conflicto detectado: {common_folder} vs {file_path} ({hostname})")
+                normalized_file = normalize_path(file_path)
+                
+                # Verificar si el archivo está dentro de alguna carpeta común (una búsqueda por longitud)
+                matches = []
+                for length in prefix_lengths:
+                    if length > len(normalized_file):
+                        break
+                    matches.extend(common_index.get(normalized_file[:length], ()))
+                
+                # Mantener el orden de las carpetas en la configuración
+                for _, common_folder in sorted(matches):
+                    conflicts.append((common_folder, file_path, hostname))
+                    logger.debug(f"Conflicto detectado: {common_folder} vs {file_path} ({hostname})")
         
         return conflicts
 
@@ -52,7 +69,7 @@ class ConflictResolver:
                 if self.dry_run:
                     logger.info(f"[DRY-RUN] Migraría: {source_path} → {dest_path}")
                 else:
-                    shutil.copy2(source_path, dest_path)
+                    fast_copy2(source_path, dest_path)
                     logger.debug(f"Archivo migrado: {source_path} → {dest_path}")
                 return True
             elif dest_path.exists():
@@ -65,6 +82,21 @@ class ConflictResolver:
             logger.error(f"Error migrando archivo {source_path} → {dest_path}: {e}")
             return False
 
+    def _fsync_files(self, paths) -> None:
+        """Hacer fsync de varios archivos seguidos (el primero vuelca el journal, el resto casi no cuesta)"""
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError as e:
+                logger.warning(f"No se pudo abrir para fsync {path}: {e}")
+                continue
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                logger.warning(f"Error en fsync de {path}: {e}")
+            finally:
+                os.close(fd)
+
     def reorganize_conflicted_folders(self, conflicts: List[Tuple[str, str, str]]) -> bool:
         """Reorganizar carpetas con conflictos de override parcial"""
         if not conflicts:
@@ -91,6 +123,7 @@ class ConflictResolver:
             
             # Migrar cada archivo específico a su hostname correspondiente
             success = True
+            jobs = []  # (origen en common, destino) a migrar
             for file_path, hostname in file_assignments:
                 # Verificar si el archivo debe procesarse según lógica ignore
                 should_process, reason = self.ignore.should_process_path(file_path)
@@ -107,15 +140,42 @@ class ConflictResolver:
                     logger.debug(f"Archivo {file_path} no existe en common pero está explícitamente en {hostname} - OK")
                     continue
                 
-                if not self.backup_and_migrate_file(source_file, dest_file):
+                jobs.append((source_file, dest_file))
+            
+            # Una ruta repetida (en el mismo host o en dos con el mismo destino) se copia una sola vez:
+            # dos copias concurrentes escribirían el mismo destino
+            jobs = list(dict.fromkeys(jobs))
+            
+            # Las copias se hacen en paralelo (en dry-run solo se registran, en orden)
+            if self.dry_run or len(jobs) < 2:
+                results = [self.backup_and_migrate_file(*job) for job in jobs]
+            else:
+                with ThreadPoolExecutor(max_workers=min(_MIGRATE_WORKERS, len(jobs))) as executor:
+                    results = list(executor.map(lambda job: self.backup_and_migrate_file(*job), jobs))
+            
+            # (origen en common, destino) ya copiados, pendientes de fsync y borrado
+            migrated = []
+            failed_sources = set()
+            for (source_file, dest_file), migrated_ok in zip(jobs, results):
+                if not migrated_ok:
                     success = False
+                    failed_sources.add(source_file)
                 elif not self.dry_run and source_file.exists():
                     # Solo eliminar archivo de common si realmente se migró desde ahí
-                    try:
-                        source_file.unlink()
-                        logger.debug(f"Archivo eliminado de common: {source_file}")
-                    except OSError as e:
-                        logger.warning(f"No se pudo eliminar archivo de common: {e}")
+                    migrated.append((source_file, dest_file))
+            
+            # Asegurar en disco todas las copias de la carpeta de una vez antes de borrar los originales
+            self._fsync_files(dest_file for _, dest_file in migrated)
+            
+            # Un origen migrado a varios hosts se elimina una sola vez, y solo si todas sus copias salieron bien
+            sources = dict.fromkeys(source_file for source_file, _ in migrated
+                                    if source_file not in failed_sources)
+            for source_file in sources:
+                try:
+                    source_file.unlink()
+                    logger.debug(f"Archivo eliminado de common: {source_file}")
+                except OSError as e:
+                    logger.warning(f"No se pudo eliminar archivo de common: {e}")
             
             if not success:
                 logger.error(f"Error reorganizando carpeta: {common_folder}")
@@ -4,26 +4,55 @@ Sync-Arch Git Operations
 Operaciones Git para sincronización de dotfiles.
 """
 
+import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Tuple
 from .utils import run_command
 
 logger = logging.getLogger(__name__)
 
+# Segundos durante los que se reutiliza el resultado de cada consulta
+_STATUS_TTL = 2.0    # git status (local)
+_REMOTE_TTL = 30.0   # git fetch + rev-list (red)
+
 class GitOperations:
     """Operaciones Git para sincronización"""
     
     def __init__(self, repo_dir: Path, dry_run: bool = False):
         self.repo_dir = repo_dir
         self.dry_run = dry_run
+        
+        # Resultados recientes: (instante monotonic, valor); se invalidan tras escribir en el repo
+        self._status_cache = None
+        self._remote_cache = None
+        self._git_status_cache = None
+    
+    def _cached(self, cache, ttl: float):
+        """Devolver el valor de una entrada de caché si no ha caducado, o None"""
+        if cache is not None and time.monotonic() - cache[0] < ttl:
+            return cache[1]
+        return None
+    
+    def _invalidate_status_cache(self) -> None:
+        """Olvidar los resultados memorizados (tras stash, pull, commit o push)"""
+        self._status_cache = None
+        self._remote_cache = None
+        self._git_status_cache = None
     
     def has_local_changes(self) -> bool:
         """Verificar si hay cambios locales pendientes"""
+        cached = self._cached(self._status_cache, _STATUS_TTL)
+        if cached is not None:
+            return cached
         try:
             result = run_command(['git', 'status', '--porcelain'], cwd=self.repo_dir, dry_run=False)
             has_changes = bool(result.stdout.strip())
             logger.debug(f"Cambios locales detectados: {has_changes}")
+            self._status_cache = (time.monotonic(), has_changes)
             return has_changes
         except Exception as e:
             logger.error(f"Error verificando cambios locales: {e}")
@@ -31,29 +60,60 @@ class GitOperations:
     
     def has_remote_changes(self) -> bool:
         """Verificar si hay cambios remotos pendientes"""
+        cached = self._cached(self._remote_cache, _REMOTE_TTL)
+        if cached is not None:
+            return cached
         try:
-            # Fetch para actualizar referencias remotas
-            run_command(['git', 'fetch'], cwd=self.repo_dir, dry_run=False)
-            
-            # Contar commits pendientes desde remoto
-            result = run_command(['git', 'rev-list', '--count', 'HEAD..origin/main'], 
-                                cwd=self.repo_dir, dry_run=False)
+            # Si el commit remoto ya está en local basta con contar contra él: sin fetch ni descarga de packs
+            result = self._count_against_remote_head()
+            if result is None:
+                # Fetch para actualizar referencias remotas
+                run_command(['git', 'fetch'], cwd=self.repo_dir, dry_run=False, capture=False)
+                
+                # Contar commits pendientes desde remoto
+                result = run_command(['git', 'rev-list', '--count', 'HEAD..origin/main'], 
+                                    cwd=self.repo_dir, dry_run=False)
             remote_commits = int(result.stdout.strip() or 0)
             has_remote = remote_commits > 0
             
             logger.debug(f"Cambios remotos detectados: {has_remote} ({remote_commits} commits)")
+            self._remote_cache = (time.monotonic(), has_remote)
             return has_remote
         except Exception as e:
             logger.error(f"Error verificando cambios remotos: {e}")
             return False
     
+    def _count_against_remote_head(self):
+        """Contar HEAD..<main remoto> con el SHA de `git ls-remote` si ese commit ya existe en local
+        
+        Devuelve None si hace falta un fetch (sin red, o commits remotos nuevos).
+        """
+        ls_remote = run_command(['git', 'ls-remote', 'origin', 'refs/heads/main'],
+                               cwd=self.repo_dir, check=False, dry_run=False)
+        remote_sha = ls_remote.stdout.split('\t', 1)[0].strip() if ls_remote.returncode == 0 else ''
+        if not remote_sha:
+            return None
+        
+        result = run_command(['git', 'rev-list', '--count', f'HEAD..{remote_sha}'],
+                            cwd=self.repo_dir, check=False, dry_run=False)
+        if result.returncode != 0:
+            return None  # El commit remoto no está en local: hay que descargarlo
+        logger.debug(f"main remoto ({remote_sha[:7]}) ya presente en local, se omite git fetch")
+        return result
+    
+    def probe_changes(self) -> Tuple[bool, bool]:
+        """Consultar cambios locales y remotos a la vez (git status se solapa con el fetch de red)"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            local_future = executor.submit(self.has_local_changes)
+            remote_future = executor.submit(self.has_remote_changes)
+            return local_future.result(), remote_future.result()
+    
     def sync_from_git(self) -> bool:
         """Sincronizar cambios desde Git (pull)"""
         try:
             logger.info("Sincronizando cambios desde Git...")
             
-            local_changes = self.has_local_changes()
-            remote_changes = self.has_remote_changes()
+            local_changes, remote_changes = self.probe_changes()
             
             logger.debug(f"Cambios locales: {local_changes}, cambios remotos: {remote_changes}")
             
@@ -61,29 +121,21 @@ class GitOperations:
                 logger.info("No hay cambios para sincronizar")
                 return True
             
-            # Si hay cambios locales, hacer stash
-            if local_changes:
-                run_command(['git', 'stash', 'push', '-m', 'autosave'], 
-                           cwd=self.repo_dir, dry_run=self.dry_run)
-                logger.debug("Cambios locales guardados en stash")
-            
-            # Pull con rebase
-            run_command(['git', 'pull', '--rebase'], 
-                       cwd=self.repo_dir, dry_run=self.dry_run)
+            # Pull con rebase; --autostash guarda y restaura los cambios locales
+            # (equivale a stash push + pull + stash pop en un solo proceso)
+            run_command(['git', 'pull', '--rebase', '--autostash'], 
+                       cwd=self.repo_dir, dry_run=self.dry_run, capture=False)
             logger.debug("Pull con rebase completado")
             
-            # Restaurar stash si había cambios locales
-            if local_changes:
-                run_command(['git', 'stash', 'pop'], 
-                           cwd=self.repo_dir, check=False, dry_run=self.dry_run)
-                logger.debug("Stash restaurado")
-            
             logger.info("Cambios sincronizados desde Git")
             return True
             
         except Exception as e:
             logger.error(f"Error sincronizando desde Git: {e}")
             return False
+        finally:
+            # Tras el pull (o antes de que otros pasos toquen el repo) hay que volver a consultar
+            self._invalidate_status_cache()
     
     def sync_to_git(self, message: str = None) -> bool:
         """Sincronizar cambios hacia Git (commit + push)"""
@@ -95,20 +147,21 @@ class GitOperations:
             logger.info("Sincronizando cambios hacia Git...")
             
             # Agregar todos los cambios
-            run_command(['git', 'add', '-A'], cwd=self.repo_dir, dry_run=self.dry_run)
+            run_command(['git', 'add', '-A'], cwd=self.repo_dir, dry_run=self.dry_run, capture=False)
             
             # Crear mensaje de commit
             if not message:
-                hostname = run_command(['uname', '-n'], dry_run=False).stdout.strip()
+                # Mismo valor que `uname -n`, sin lanzar un proceso
+                hostname = os.uname().nodename
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 message = f"Auto sync from {hostname} at {timestamp}"
             
             # Commit
             run_command(['git', 'commit', '-m', message], 
-                       cwd=self.repo_dir, dry_run=self.dry_run)
+                       cwd=self.repo_dir, dry_run=self.dry_run, capture=False)
             
             # Push
-            run_command(['git', 'push'], cwd=self.repo_dir, dry_run=self.dry_run)
+            run_command(['git', 'push'], cwd=self.repo_dir, dry_run=self.dry_run, capture=False)
             
             logger.info("Cambios sincronizados al repositorio Git")
             return True
@@ -116,28 +169,43 @@ class GitOperations:
         except Exception as e:
             logger.error(f"Error sincronizando hacia Git: {e}")
             return False
+        finally:
+            self._invalidate_status_cache()
+    
+    def _parse_branch_header(self, header: str) -> str:
+        """Extraer la rama de la cabecera de `git status --porcelain --branch` (como `git branch --show-current`)"""
+        header = header[3:] if header.startswith('## ') else ''
+        if header.startswith('HEAD (no branch)'):
+            return ''  # HEAD desacoplado
+        for prefix in ('No commits yet on ', 'Initial commit on '):
+            if header.startswith(prefix):
+                return header[len(prefix):]
+        # "main...origin/main [ahead 1]" -> "main"
+        return header.split('...', 1)[0].split(' ', 1)[0]
     
     def get_status(self) -> dict:
         """Obtener estado del repositorio Git"""
+        cached = self._cached(self._git_status_cache, _STATUS_TTL)
+        if cached is not None:
+            return dict(cached)
         try:
-            # Estado general
-            status_result = run_command(['git', 'status', '--porcelain'], 
-                                      cwd=self.repo_dir, dry_run=False)
-            
-            # Información de branch
-            branch_result = run_command(['git', 'branch', '--show-current'], 
+            # Estado general e información de branch en una sola llamada (cabecera "## ...")
+            status_result = run_command(['git', 'status', '--porcelain', '--branch'], 
                                       cwd=self.repo_dir, dry_run=False)
+            header, _, status_output = status_result.stdout.partition('\n')
             
             # Último commit
             commit_result = run_command(['git', 'log', '-1', '--oneline'], 
                                       cwd=self.repo_dir, dry_run=False)
             
-            return {
-                'has_changes': bool(status_result.stdout.strip()),
-                'branch': branch_result.stdout.strip(),
+            status = {
+                'has_changes': bool(status_output.strip()),
+                'branch': self._parse_branch_header(header),
                 'last_commit': commit_result.stdout.strip(),
-                'status_output': status_result.stdout
+                'status_output': status_output
             }
+            self._git_status_cache = (time.monotonic(), status)
+            return dict(status)
         except Exception as e:
             logger.error(f"Error obteniendo estado Git: {e}")
             return {
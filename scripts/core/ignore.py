@@ -4,34 +4,132 @@ Sync-Arch Ignore Logic
 Manejo de patrones ignore y lógica de precedencia: hostname > ignore > common
 """
 
+import re
 import fnmatch
 import logging
+import functools
 from pathlib import Path
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+def _glob_to_regex(pattern: str) -> str:
+    """Traducir un patrón con ** a regex, igual que IgnoreManager._regex_match"""
+    pattern_escaped = re.escape(pattern)
+    pattern_escaped = pattern_escaped.replace('\\*\\*', '.*')
+    pattern_escaped = pattern_escaped.replace('\\*', '[^/]*')
+    return f'{pattern_escaped}$'
+
+@functools.lru_cache(maxsize=512)
+def _compile_glob(pattern: str) -> re.Pattern:
+    """Compilar un patrón con ** una sola vez (memorizado por patrón)"""
+    return re.compile(_glob_to_regex(pattern))
+
+@functools.lru_cache(maxsize=512)
+def _compile_fnmatch(pattern: str) -> re.Pattern:
+    """Compilar un patrón simple como fnmatch.fnmatch en POSIX (memorizado por patrón)"""
+    return re.compile(fnmatch.translate(pattern))
+
+def _compile_ignore_patterns(patterns: List[str]) -> re.Pattern:
+    """Fusionar los patrones ignore en una sola regex"""
+    alternatives = []
+    for pattern in patterns:
+        pattern = pattern.replace('\\', '/')
+        if '**' in pattern:
+            # Mismas variantes que _match_glob_pattern
+            variants = [pattern]
+            if pattern.startswith('**/'):
+                variants.append(pattern[3:])
+            if pattern.endswith('/**'):
+                variants.append(pattern[:-3])
+            alternatives.extend(_glob_to_regex(variant) for variant in variants)
+        else:
+            alternatives.append(fnmatch.translate(pattern))
+    
+    if not alternatives:
+        return re.compile(r'(?!)')  # no coincide con nada
+    return re.compile('|'.join(f'(?:{alternative})' for alternative in alternatives))
+
 class IgnoreManager:
     """Gestor de lógica ignore y precedencia"""
     
     def __init__(self, config_manager, hostname: str):
         self.config = config_manager
         self.hostname = hostname
+        
+        # Rutas del hostname ya normalizadas:
+        # (versión del config, {ruta: posición}, [(posición, carpeta)], tupla de carpetas)
+        self._inclusion_index = None
+        
+        # Regex fusionada de los patrones ignore: (versión del config, regex compilada)
+        self._ignore_regex = None
+    
+    def reload(self) -> None:
+        """Volver a leer las rutas del hostname y los patrones en la próxima consulta (tras cambiar la configuración)"""
+        self._inclusion_index = None
+        self._ignore_regex = None
+    
+    def _get_inclusion_index(self):
+        """Normalizar una sola vez las rutas del hostname (se recalcula si cambia el config)"""
+        index = self._inclusion_index
+        if index is None or index[0] != self.config.version:
+            exact = {}
+            folders = []
+            for position, file_path in enumerate(self.config.get_hostname_paths(self.hostname)):
+                config_path = self.config.normalize_path(file_path)
+                exact.setdefault(config_path, position)
+                if config_path.endswith('/'):
+                    folders.append((position, config_path))
+            prefixes = tuple(folder for _, folder in folders)
+            index = self._inclusion_index = (self.config.version, exact, folders, prefixes)
+        return index
+    
+    def _get_ignore_regex(self) -> re.Pattern:
+        """Compilar una sola vez los patrones ignore (se recompila si cambia el config)"""
+        cached = self._ignore_regex
+        if cached is None or cached[0] != self.config.version:
+            cached = self._ignore_regex = (self.config.version,
+                                           _compile_ignore_patterns(self.config.get_ignore_patterns()))
+        return cached[1]
+    
+    def _find_inclusion(self, normalized_path: str) -> Optional[str]:
+        """Primera ruta del hostname que incluye normalized_path (exacta o carpeta con '/'), o None"""
+        _, exact, folders, prefixes = self._get_inclusion_index()
+        exact_position = exact.get(normalized_path)
+        # Un solo startswith con la tupla descarta en C las rutas fuera de toda carpeta;
+        # el bucle solo se recorre para saber cuál de ellas coincide primero
+        if not normalized_path.startswith(prefixes):
+            return normalized_path if exact_position is not None else None
+        for position, folder in folders:
+            if exact_position is not None and position > exact_position:
+                break
+            if normalized_path.startswith(folder):
+                return folder
+        return normalized_path if exact_position is not None else None
     
     def should_ignore_path(self, path: str) -> bool:
         """Verificar si una ruta debe ser ignorada según patrones en config.json"""
-        ignore_patterns = self.config.get_ignore_patterns()
-        
         # Normalizar ruta
         normalized_path = self.config.normalize_path(path)
         
-        for pattern in ignore_patterns:
-            # Manejar diferentes tipos de patrones
-            if self._match_pattern(normalized_path, pattern):
-                logger.debug(f"Ruta {normalized_path} coincide con patrón ignore: {pattern}")
-                return True
-                
-        return False
+        # Una sola regex con todos los patrones
+        if not self._get_ignore_regex().match(normalized_path.replace('\\', '/')):
+            return False
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            # Buscar qué patrón coincide solo para el mensaje de depuración
+            for pattern in self.config.get_ignore_patterns():
+                if self._match_pattern(normalized_path, pattern):
+                    logger.debug(f"Ruta {normalized_path} coincide con patrón ignore: {pattern}")
+                    break
+        return True
+
+    def compile_ignore_regex(self) -> re.Pattern:
+        """Compilar todos los patrones ignore en una sola regex equivalente a should_ignore_path
+        
+        La ruta a comprobar debe estar normalizada y con separadores '/'.
+        """
+        return self._get_ignore_regex()
 
     def _match_pattern(self, path: str, pattern: str) -> bool:
         """Verificar si una ruta coincide con un patrón, manejando ** correctamente"""
@@ -43,13 +141,11 @@ class IgnoreManager:
         if '**' in pattern:
             return self._match_glob_pattern(path, pattern)
         else:
-            # Para patrones simples, usar fnmatch
-            return fnmatch.fnmatch(path, pattern)
+            # Para patrones simples, usar fnmatch (regex compilada una vez)
+            return _compile_fnmatch(pattern).match(path) is not None
     
     def _match_glob_pattern(self, path: str, pattern: str) -> bool:
         """Manejar patrones con ** de manera más robusta"""
-        import re
-        
         # Para patrones que empiezan con **, también verificar sin el prefijo de directorio
         patterns_to_check = [pattern]
         
@@ -69,51 +165,32 @@ class IgnoreManager:
     
     def _regex_match(self, path: str, pattern: str) -> bool:
         """Convertir patrón glob a regex y verificar coincidencia"""
-        import re
-        
-        # Escapar caracteres especiales regex excepto * y **
-        pattern_escaped = re.escape(pattern)
-        
-        # Reemplazar los ** escapados por regex apropiada (cualquier cosa incluyendo /)
-        pattern_escaped = pattern_escaped.replace('\\*\\*', '.*')
-        
-        # Reemplazar * simples por regex apropiada (cualquier cosa excepto /)
-        pattern_escaped = pattern_escaped.replace('\\*', '[^/]*')
-        
-        # Agregar anchors
-        pattern_regex = f'^{pattern_escaped}$'
-        
+        # ** -> cualquier cosa incluyendo /, * -> cualquier cosa excepto / (ver _glob_to_regex)
         try:
-            return bool(re.match(pattern_regex, path))
+            return _compile_glob(pattern).match(path) is not None
         except re.error:
             # Fallback a fnmatch en caso de error
             return fnmatch.fnmatch(path, pattern)
 
     def is_explicitly_included(self, path: str) -> bool:
         """Verificar si una ruta está explícitamente incluida en hostname específico"""
-        hostname_files = self.config.get_hostname_paths(self.hostname)
-        
-        if not hostname_files:
-            return False
-        
         # Normalizar ruta
         normalized_path = self.config.normalize_path(path)
         
-        for file_path in hostname_files:
-            # Normalizar ruta del config
-            config_path = self.config.normalize_path(file_path)
-            
-            # Verificar coincidencia exacta
-            if config_path == normalized_path:
-                logger.debug(f"Ruta {normalized_path} está explícitamente incluida en {self.hostname}")
-                return True
-                
-            # Verificar si la ruta está dentro de una carpeta especificada
-            if config_path.endswith('/') and normalized_path.startswith(config_path):
-                logger.debug(f"Ruta {normalized_path} está dentro de carpeta explícita {config_path} en {self.hostname}")
-                return True
-                
-        return False
+        # Coincidencia exacta (dict) o dentro de una carpeta especificada
+        config_path = self._find_inclusion(normalized_path)
+        if config_path is None:
+            return False
+        
+        if config_path == normalized_path:
+            logger.debug(f"Ruta {normalized_path} está explícitamente incluida en {self.hostname}")
+        else:
+            logger.debug(f"Ruta {normalized_path} está dentro de carpeta explícita {config_path} en {self.hostname}")
+        return True
+
+    def clear_cache(self) -> None:
+        """Vaciar las cachés de consultas"""
+        self.reload()
 
     def should_process_path(self, path: str) -> Tuple[bool, str]:
         """
@@ -132,3 +209,27 @@ class IgnoreManager:
             
         # Precedencia 3: En common (se procesa por defecto)
         return True, "permitido por configuración común"
+
+    def filter_paths(self, paths: List[str]) -> List[Tuple[str, bool, str]]:
+        """Aplicar should_process_path a una lista de rutas de una vez
+
+        Normaliza todas las rutas y evalúa la regex fusionada con map (el bucle corre en C).
+        No emite los mensajes de depuración por ruta de is_explicitly_included/should_ignore_path.
+
+        Returns:
+            List[Tuple[str, bool, str]]: (ruta, should_process, reason) en el orden de entrada
+        """
+        normalized_paths = list(map(self.config.normalize_path, paths))
+        ignored = list(map(self.compile_ignore_regex().match,
+                           [normalized.replace('\\', '/') for normalized in normalized_paths]))
+
+        included_reason = f"explícitamente incluido en {self.hostname}"
+        results = []
+        for path, normalized_path, ignore_match in zip(paths, normalized_paths, ignored):
+            if self._find_inclusion(normalized_path) is not None:
+                results.append((path, True, included_reason))
+            elif ignore_match is not None:
+                results.append((path, False, "coincide con patrón ignore"))
+            else:
+                results.append((path, True, "permitido por configuración común"))
+        return results
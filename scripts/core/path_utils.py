@@ -5,9 +5,12 @@ Funciones centralizadas para manejo de rutas del repositorio,
 rutas gestionadas y normalización de paths.
 """
 
+import os
 import logging
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .utils import batch_stat
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,53 @@ class PathUtils:
         self.dotfiles_dir = dotfiles_dir
         self.home_dir = home_dir
         self.hostname = hostname or "localhost"
+        
+        # Rutas ya resueltas por resolve_cached (incluye los directorios padre)
+        self._resolved = {}
+        
+        # Rutas gestionadas por include_system_configs: (versión del config, resultado)
+        self._managed_cache = {}
+        self._managed_dict_cache = {}
+        self._parent_index_cache = {}
+    
+    def resolve_cached(self, path) -> str:
+        """Resolver una ruta como os.path.realpath, memorizando cada directorio ya resuelto
+        
+        Si la ruta no es un symlink, su forma canónica es la del padre resuelto más su
+        nombre, así que las rutas que comparten ancestros solo hacen un lstat por componente.
+        """
+        path = os.fspath(path)
+        resolved = self._resolved.get(path)
+        if resolved is not None:
+            return resolved
+        
+        parent, name = os.path.split(path)
+        if (not os.path.isabs(path) or parent == path or
+                os.path.normpath(path) != path or os.path.islink(path)):
+            # Rutas relativas, con '..', la raíz o symlinks: resolución completa
+            resolved = os.path.realpath(path)
+        else:
+            resolved = os.path.join(self.resolve_cached(parent), name)
+        
+        self._resolved[path] = resolved
+        return resolved
+    
+    def clear_resolve_cache(self) -> None:
+        """Olvidar las rutas resueltas (tras cambios en symlinks)"""
+        self._resolved.clear()
+    
+    def batch_stat(self, paths: List, follow_symlinks: bool = True) -> List[Optional[os.stat_result]]:
+        """Hacer stat (o lstat) de muchas rutas a la vez, en el mismo orden; None si no existe
+        
+        Las llamadas liberan el GIL, así que con listas grandes se solapan en varios hilos.
+        """
+        return batch_stat(paths, follow_symlinks)
+    
+    def invalidate(self) -> None:
+        """Olvidar las rutas gestionadas memorizadas"""
+        self._managed_cache.clear()
+        self._managed_dict_cache.clear()
+        self._parent_index_cache.clear()
     
     def get_repo_path(self, source: str, normalized_path: str) -> Path:
         """Obtener la ruta en el repositorio para un archivo/directorio
@@ -59,6 +109,10 @@ class PathUtils:
             List[Dict]: Lista de diccionarios con información de cada ruta gestionada
                 Cada dict contiene: 'path', 'normalized', 'source'
         """
+        cached = self._managed_cache.get(include_system_configs)
+        if cached is not None and cached[0] == self.config.version:
+            return list(cached[1])
+        
         managed_paths = []
         
         # Rutas comunes
@@ -94,7 +148,8 @@ class PathUtils:
                     'source': 'system_configs'
                 })
         
-        return managed_paths
+        self._managed_cache[include_system_configs] = (self.config.version, managed_paths)
+        return list(managed_paths)
     
     def get_all_managed_paths_dict(self, include_system_configs: bool = True) -> Dict[str, Dict]:
         """Obtener todas las rutas gestionadas como diccionario indexado por path
@@ -104,9 +159,16 @@ class PathUtils:
             
         Returns:
             Dict[str, Dict]: Diccionario indexado por 'normalized' con info de cada ruta
+                (memorizado: no modificar)
         """
+        cached = self._managed_dict_cache.get(include_system_configs)
+        if cached is not None and cached[0] == self.config.version:
+            return cached[1]
+        
         managed_paths = self.get_managed_paths(include_system_configs)
-        return {path_info['normalized']: path_info for path_info in managed_paths}
+        managed_dict = {path_info['normalized']: path_info for path_info in managed_paths}
+        self._managed_dict_cache[include_system_configs] = (self.config.version, managed_dict)
+        return managed_dict
     
     def is_path_managed(self, normalized_path: str, include_system_configs: bool = True) -> bool:
         """Verificar si una ruta está siendo gestionada por sync-arch
@@ -145,24 +207,40 @@ class PathUtils:
         Returns:
             Dict: Info del directorio padre gestionado o None si no hay
         """
-        managed_paths = self.get_managed_paths(include_system_configs)
+        index = self._get_parent_index(include_system_configs)
         
-        # Ordenar por especificidad (rutas más largas primero)
-        managed_paths.sort(key=lambda x: len(x['normalized']), reverse=True)
+        # Probar cada prefijo de componentes de la ruta (equivale a relative_to) y
+        # quedarse con el más específico
+        path_obj = Path(normalized_path)
+        parts = path_obj.parts
+        best = None
+        # Una ruta vacía ('.') solo contiene rutas relativas
+        for depth in range(1 if path_obj.anchor else 0, len(parts) + 1):
+            hit = index.get(parts[:depth])
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
         
-        normalized_path_obj = Path(normalized_path)
+        return best[1] if best is not None else None
+    
+    def _get_parent_index(self, include_system_configs: bool) -> Dict:
+        """Índice de rutas gestionadas por componentes: parts -> ((longitud, -posición), path_info)
         
-        for path_info in managed_paths:
-            managed_path_obj = Path(path_info['normalized'])
-            
-            # Verificar si normalized_path está dentro de managed_path
-            try:
-                normalized_path_obj.relative_to(managed_path_obj)
-                return path_info
-            except ValueError:
-                continue
+        El rango reproduce el orden por especificidad (rutas más largas primero, y a igual
+        longitud la primera de la lista).
+        """
+        cached = self._parent_index_cache.get(include_system_configs)
+        if cached is not None and cached[0] == self.config.version:
+            return cached[1]
         
-        return None
+        index = {}
+        for position, path_info in enumerate(self.get_managed_paths(include_system_configs)):
+            parts = Path(path_info['normalized']).parts
+            rank = (len(path_info['normalized']), -position)
+            if parts not in index or rank > index[parts][0]:
+                index[parts] = (rank, path_info)
+        
+        self._parent_index_cache[include_system_configs] = (self.config.version, index)
+        return index
     
     def resolve_path_conflicts(self, paths: List[str]) -> Dict[str, str]:
         """Resolver conflictos de rutas cuando hay overlaps entre common y hostname
@@ -210,3 +288,5 @@ class PathUtils:
         for directory in directories_to_create:
             directory.mkdir(parents=True, exist_ok=True)
             logger.debug(f"Directorio asegurado: {directory}")
+        
+        self.invalidate()
@@ -5,15 +5,52 @@ Operaciones GNU Stow para gestión de symlinks.
 """
 
 import os
-import shutil
+import stat
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import List
-from .utils import run_command
+from .utils import run_command, batch_stat, fast_copy2
 
 logger = logging.getLogger(__name__)
 
+# Hilos para los backups de archivos conflictivos (cada copia es independiente)
+_BACKUP_WORKERS = 8
+
+def _walk_files(top: str) -> List[str]:
+    """Archivos bajo top en el mismo orden que os.walk (sin seguir symlinks a directorios)
+
+    Usa os.scandir directamente: el tipo de cada entrada sale de getdents sin stat extra.
+    """
+    files = []
+    pending = [top]
+    while pending:
+        directory = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Igual que os.walk: los symlinks a directorios no son archivos, pero no se recorren
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.path)
+                        continue
+                    try:
+                        is_symlink = entry.is_symlink()
+                    except OSError:
+                        is_symlink = False
+                    if not is_symlink:
+                        subdirs.append(entry.path)
+        except OSError:
+            continue  # os.walk ignora los directorios que no se pueden leer
+        # Recorrido en profundidad en orden de scandir
+        pending.extend(reversed(subdirs))
+    return files
+
 class StowOperations:
     """Operaciones GNU Stow"""
     
@@ -22,16 +59,21 @@ class StowOperations:
         self.home_dir = home_dir
         self.dry_run = dry_run
     
-    def apply_stow(self, packages: List[str]) -> bool:
-        """Aplicar GNU Stow con paquetes especificados"""
+    def apply_stow(self, packages: List[str], clean: bool = False) -> bool:
+        """Aplicar GNU Stow con paquetes especificados
+        
+        `stow -R` ya deshace y rehace los enlaces en una sola ejecución; clean=True fuerza
+        además un `stow -D` previo.
+        """
         try:
-            # Primero, unstow todo para limpiar
-            run_command(['stow', '-D'] + packages, 
-                       cwd=self.dotfiles_dir, check=False, dry_run=self.dry_run)
+            if clean:
+                # Unstow todo para limpiar
+                run_command(['stow', '-D'] + packages, 
+                           cwd=self.dotfiles_dir, check=False, dry_run=self.dry_run, capture=False)
             
-            # Luego, restow para aplicar cambios
+            # Restow para aplicar cambios (todos los paquetes en una sola invocación)
             run_command(['stow', '-v', '-R'] + packages, 
-                       cwd=self.dotfiles_dir, dry_run=self.dry_run)
+                       cwd=self.dotfiles_dir, dry_run=self.dry_run, capture=False)
             
             logger.info(f"Stow aplicado exitosamente para: {', '.join(packages)}")
             return True
@@ -44,8 +86,11 @@ class StowOperations:
         """Detectar archivos existentes que conflictúan con symlinks de stow"""
         conflicts = []
         
-        # Obtener rutas que serían gestionadas por stow
-        managed_paths = []
+        # Obtener rutas que serían gestionadas por stow, como cadenas y sin duplicados
+        # (dict ordenado: una ruta en common y en el hostname solo se comprueba y devuelve una vez)
+        managed_paths = {}
+        home_str = os.fspath(self.home_dir)
+        common_prefix_len = len(os.path.join(os.fspath(self.dotfiles_dir / "common"), ''))
         
         # Rutas de common (aplicando lógica ignore)
         for path in config_manager.get_common_paths():
@@ -57,25 +102,22 @@ class StowOperations:
                     common_dir = self.dotfiles_dir / "common" / path.lstrip('./')
                     
                 if common_dir.exists():
-                    for root, dirs, files in os.walk(common_dir):
-                        for file in files:
-                            file_path = Path(root) / file
-                            relative_path = file_path.relative_to(self.dotfiles_dir / "common")
-                            
-                            # Aplicar lógica ignore con precedencia
-                            should_process, reason = ignore_manager.should_process_path(str(relative_path))
-                            if should_process:
-                                target_path = self.home_dir / relative_path
-                                managed_paths.append(target_path)
-                                logger.debug(f"Archivo gestionado: {relative_path} - {reason}")
-                            else:
-                                logger.debug(f"Archivo ignorado: {relative_path} - {reason}")
+                    # Rutas relativas a common/ por corte de cadena (common_dir siempre cuelga de common/)
+                    relative_paths = [file_path[common_prefix_len:] for file_path in _walk_files(str(common_dir))]
+                    
+                    # Aplicar lógica ignore con precedencia, a todos los archivos de una vez
+                    # (regex fusionada compilada una sola vez en lugar de should_process_path por archivo)
+                    for relative_path, should_process, reason in ignore_manager.filter_paths(relative_paths):
+                        if should_process:
+                            managed_paths[os.path.join(home_str, relative_path)] = None
+                            logger.debug(f"Archivo gestionado: {relative_path} - {reason}")
+                        else:
+                            logger.debug(f"Archivo ignorado: {relative_path} - {reason}")
             else:
                 # Es archivo específico
                 should_process, reason = ignore_manager.should_process_path(path)
                 if should_process:
-                    target_path = self.home_dir / path.lstrip('./')
-                    managed_paths.append(target_path)
+                    managed_paths[os.fspath(self.home_dir / path.lstrip('./'))] = None
                     logger.debug(f"Archivo gestionado: {path} - {reason}")
                 else:
                     logger.debug(f"Archivo ignorado: {path} - {reason}")
@@ -84,13 +126,15 @@ class StowOperations:
         hostname = ignore_manager.hostname
         hostname_paths = config_manager.get_hostname_paths(hostname)
         for path in hostname_paths:
-            target_path = self.home_dir / path.lstrip('./')
-            managed_paths.append(target_path)
+            managed_paths[os.fspath(self.home_dir / path.lstrip('./'))] = None
             logger.debug(f"Archivo explícito de {hostname}: {path}")
         
-        # Verificar conflictos
-        for target_path in managed_paths:
-            if target_path.exists() and not target_path.is_symlink():
+        # Verificar conflictos: existe y no es symlink equivale a un lstat correcto sin S_IFLNK
+        # (todos los lstat de una vez, en paralelo si son muchos); solo los conflictos pasan a Path
+        managed_paths = list(managed_paths)
+        for target_str, st in zip(managed_paths, batch_stat(managed_paths, follow_symlinks=False)):
+            if st is not None and not stat.S_ISLNK(st.st_mode):
+                target_path = Path(target_str)
                 conflicts.append(target_path)
                 logger.debug(f"Conflicto detectado: archivo existente {target_path}")
         
@@ -107,7 +151,7 @@ class StowOperations:
             if self.dry_run:
                 logger.info(f"[DRY-RUN] Haría backup: {file_path} → {backup_file}")
             else:
-                shutil.copy2(file_path, backup_file)
+                fast_copy2(file_path, backup_file)
                 logger.info(f"Backup creado: {file_path} → {backup_file}")
             
             return True
@@ -155,11 +199,20 @@ class StowOperations:
                 backup_dir.mkdir(parents=True, exist_ok=True)
                 logger.info(f"Creando backup en: {backup_dir}")
             
-            # Hacer backup de archivos conflictivos
-            for file_path in conflicts:
-                if not self.backup_existing_file(file_path, backup_dir):
-                    logger.error(f"Error en backup de {file_path}")
-                    return False
+            # Hacer backup de archivos conflictivos (en paralelo; en dry-run solo se registran, en orden)
+            if self.dry_run or len(conflicts) < 2:
+                for file_path in conflicts:
+                    if not self.backup_existing_file(file_path, backup_dir):
+                        logger.error(f"Error en backup de {file_path}")
+                        return False
+            else:
+                with ThreadPoolExecutor(max_workers=_BACKUP_WORKERS) as executor:
+                    results = list(executor.map(lambda file_path: self.backup_existing_file(file_path, backup_dir),
+                                                conflicts))
+                for file_path, backed_up in zip(conflicts, results):
+                    if not backed_up:
+                        logger.error(f"Error en backup de {file_path}")
+                        return False
         
         # Eliminar archivos conflictivos para permitir symlinks
         if not self.dry_run:
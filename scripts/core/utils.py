@@ -6,10 +6,13 @@ Utilidades comunes para el sistema.
 
 import os
 import sys
+import errno
+import shutil
 import logging
 import socket
 import fcntl
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
@@ -85,8 +88,13 @@ class SyncLock:
             except OSError:
                 pass
 
-def run_command(cmd: List[str], cwd: Optional[Path] = None, check: bool = True, dry_run: bool = False) -> subprocess.CompletedProcess:
-    """Ejecutar comando con logging"""
+def run_command(cmd: List[str], cwd: Optional[Path] = None, check: bool = True, dry_run: bool = False,
+                capture: bool = True) -> subprocess.CompletedProcess:
+    """Ejecutar comando con logging
+    
+    Con capture=False la salida estándar va directamente a /dev/null (result.stdout es None);
+    stderr se sigue capturando para el log y los errores.
+    """
     cmd_str = ' '.join(str(c) for c in cmd)
     logging.debug(f"Ejecutando: {cmd_str} (cwd: {cwd})")
     
@@ -95,7 +103,8 @@ def run_command(cmd: List[str], cwd: Optional[Path] = None, check: bool = True,
         return subprocess.CompletedProcess(cmd, 0, b"", b"")
     
     try:
-        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=check)
+        stdout = subprocess.PIPE if capture else subprocess.DEVNULL
+        result = subprocess.run(cmd, cwd=cwd, stdout=stdout, stderr=subprocess.PIPE, text=True, check=check)
         
         if result.stdout:
             logging.debug(f"stdout: {result.stdout.strip()}")
@@ -111,3 +120,60 @@ def run_command(cmd: List[str], cwd: Optional[Path] = None, check: bool = True,
         if e.stderr:
             logging.error(f"stderr: {e.stderr.strip()}")
         raise
+
+# Errores con los que copy_file_range no está soportado (kernel antiguo, otro FS, etc.)
+_COPY_RANGE_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
+
+def _copy_file_range(src: Path, dst: Path) -> bool:
+    """Copiar el contenido dentro del kernel con os.copy_file_range (reflink en btrfs/XFS)
+    
+    Devuelve False si no está soportado antes de copiar nada, para usar otro método.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+        while True:
+            try:
+                sent = os.copy_file_range(src_fd, dst_fd, 1 << 30)
+            except OSError as e:
+                if copied == 0 and e.errno in _COPY_RANGE_UNSUPPORTED:
+                    return False
+                raise
+            if not sent:
+                # 0 al principio con un origen no vacío: el sistema de archivos no lo soporta
+                if copied == 0 and os.fstat(src_fd).st_size > 0:
+                    return False
+                return True
+            copied += sent
+
+def fast_copy2(src: Path, dst: Path) -> None:
+    """Equivalente a shutil.copy2 usando copy_file_range (o sendfile vía copyfile) y un solo copystat"""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    if not _copy_file_range(src, dst):
+        # shutil.copyfile ya usa sendfile en Linux
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+# stat en paralelo: hilos y número mínimo de rutas para que compense
+_STAT_WORKERS = 8
+_PARALLEL_STAT_MIN = 64
+
+def _stat_or_none(path, follow_symlinks: bool) -> Optional[os.stat_result]:
+    """os.stat que devuelve None si la ruta no existe o no es accesible"""
+    try:
+        return os.stat(path, follow_symlinks=follow_symlinks)
+    except OSError:
+        return None
+
+def batch_stat(paths: List, follow_symlinks: bool = True) -> List[Optional[os.stat_result]]:
+    """stat (o lstat) de muchas rutas, en orden; en varios hilos si la lista es grande"""
+    if len(paths) < _PARALLEL_STAT_MIN:
+        return [_stat_or_none(path, follow_symlinks) for path in paths]
+    with ThreadPoolExecutor(max_workers=_STAT_WORKERS) as executor:
+        return list(executor.map(lambda path: _stat_or_none(path, follow_symlinks), paths,
+                                 chunksize=32))
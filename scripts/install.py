@@ -11,12 +11,13 @@ Configura dependencias, servicios systemd, estructura inicial y primera sincroni
 import os
 import subprocess
 import sys
-import json
 import shutil
-import socket
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
-import tempfile
+from typing import Dict, Optional, List
+
+# Copia con copy_file_range compartida con el resto de scripts (scripts/ está en sys.path)
+from core.utils import fast_copy2
 
 # === CONFIGURACIÓN ===
 HOME = Path.home()
@@ -24,7 +25,7 @@ REPO_DIR = Path(__file__).parent.parent
 SCRIPTS_DIR = REPO_DIR / "scripts"
 SYSTEMD_DIR = REPO_DIR / "systemd"
 SYSTEMD_USER_DIR = HOME / ".config/systemd/user"
-HOSTNAME = socket.gethostname()
+HOSTNAME = os.uname().nodename  # Mismo valor que socket.gethostname(), sin importar socket
 
 # Colores para output
 class Colors:
@@ -57,6 +58,10 @@ def info(message: str):
     """Imprimir mensaje informativo"""
     print(f"{Colors.CYAN}ℹ️  {message}{Colors.NC}")
 
+def fast_copytree(src, dst):
+    """shutil.copytree (recorrido con scandir, mismos errores y symlinks) copiando con fast_copy2"""
+    return shutil.copytree(src, dst, copy_function=fast_copy2)
+
 def run_command(cmd: List[str], check: bool = True, capture_output: bool = False) -> subprocess.CompletedProcess:
     """Ejecutar comando con manejo de errores"""
     cmd_str = ' '.join(str(c) for c in cmd)
@@ -82,16 +87,38 @@ def check_arch_linux() -> bool:
     except FileNotFoundError:
         return False
 
+def find_executables(names: List[str]) -> Dict[str, str]:
+    """Buscar varios ejecutables recorriendo PATH una sola vez (mismo criterio que shutil.which)
+
+    Devuelve {nombre: ruta} solo para los encontrados.
+    """
+    path = os.environ.get('PATH')
+    if path is None:
+        path = os.confstr('CS_PATH') or os.defpath
+    
+    found = {}
+    pending = set(names)
+    seen = set()
+    for directory in path.split(os.pathsep) if path else []:
+        if directory in seen:
+            continue
+        seen.add(directory)
+        for name in list(pending):
+            candidate = os.path.join(directory, name)
+            if os.access(candidate, os.X_OK) and not os.path.isdir(candidate):
+                found[name] = candidate
+                pending.discard(name)
+        if not pending:
+            break  # Todos encontrados: no hace falta mirar el resto de PATH
+    return found
+
 def check_dependencies() -> bool:
     """Verificar y instalar dependencias"""
     log("Verificando dependencias del sistema...")
     
     required_packages = ['git', 'python', 'stow']
-    missing_packages = []
-    
-    for package in required_packages:
-        if not shutil.which(package):
-            missing_packages.append(package)
+    found = find_executables(required_packages)
+    missing_packages = [package for package in required_packages if package not in found]
     
     if missing_packages:
         warning(f"Paquetes faltantes: {', '.join(missing_packages)}")
@@ -232,6 +259,9 @@ def create_initial_dotfiles_structure() -> bool:
     common_dir.mkdir(parents=True, exist_ok=True)
     hostname_dir.mkdir(parents=True, exist_ok=True)
     
+    # Fecha de creación (sin lanzar `date` en un subproceso)
+    created_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+    
     # Crear archivos de ejemplo si no existen
     readme_common = common_dir / "README.md"
     if not readme_common.exists():
@@ -239,7 +269,7 @@ def create_initial_dotfiles_structure() -> bool:
 
 Archivos y carpetas que se aplican a todos los equipos.
 
-Creado automáticamente por Sync-Arch el {subprocess.getoutput('date')}.
+Creado automáticamente por Sync-Arch el {created_at}.
 """)
     
     readme_hostname = hostname_dir / "README.md"
@@ -248,7 +278,7 @@ Creado automáticamente por Sync-Arch el {subprocess.getoutput('date')}.
 
 Archivos y carpetas específicos para este equipo.
 
-Creado automáticamente por Sync-Arch el {subprocess.getoutput('date')}.
+Creado automáticamente por Sync-Arch el {created_at}.
 """)
     
     success(f"Estructura de dotfiles creada (common + {HOSTNAME})")
@@ -256,6 +286,8 @@ Creado automáticamente por Sync-Arch el {subprocess.getoutput('date')}.
 
 def copy_existing_dotfiles() -> bool:
     """Copiar dotfiles existentes del usuario al repositorio"""
+    import json  # Solo se necesita aquí
+    
     log("Analizando dotfiles existentes...")
     
     # Cargar configuración
@@ -287,10 +319,10 @@ def copy_existing_dotfiles() -> bool:
             dest.parent.mkdir(parents=True, exist_ok=True)
             try:
                 if source.is_dir():
-                    shutil.copytree(source, dest)
+                    fast_copytree(source, dest)
                     log(f"Carpeta copiada: {source} → common/")
                 else:
-                    shutil.copy2(source, dest)
+                    fast_copy2(source, dest)
                     log(f"Archivo copiado: {source} → common/")
                 copied_files += 1
             except (shutil.Error, OSError) as e:
@@ -305,10 +337,10 @@ def copy_existing_dotfiles() -> bool:
             dest.parent.mkdir(parents=True, exist_ok=True)
             try:
                 if source.is_dir():
-                    shutil.copytree(source, dest)
+                    fast_copytree(source, dest)
                     log(f"Carpeta copiada: {source} → {HOSTNAME}/")
                 else:
-                    shutil.copy2(source, dest)
+                    fast_copy2(source, dest)
                     log(f"Archivo copiado: {source} → {HOSTNAME}/")
                 copied_files += 1
             except (shutil.Error, OSError) as e: